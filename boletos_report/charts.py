@@ -9,6 +9,7 @@ from typing import Optional
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib import cbook
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -19,37 +20,73 @@ plt.rcParams['figure.figsize'] = (12, 6)
 plt.rcParams['font.size'] = 10
 
 
-def save_chart(fig, output_dir: str, filename: str):
+def save_chart(fig, charts_dir: Path, filename: str, close: bool = True):
     """
     Salva gráfico em arquivo PNG.
     
     Args:
         fig: Figura do matplotlib
-        output_dir: Diretório de saída
+        charts_dir: Diretório dos gráficos (já criado)
         filename: Nome do arquivo
+        close: Se True, fecha a figura após salvar
     """
-    output_path = Path(output_dir) / "charts"
-    output_path.mkdir(parents=True, exist_ok=True)
-    
-    filepath = output_path / filename
-    fig.savefig(filepath, dpi=150, bbox_inches='tight')
-    plt.close(fig)
+    filepath = charts_dir / filename
+    # Compressão zlib leve: codificação bem mais rápida, arquivos pouco maiores
+    fig.savefig(filepath, dpi=150, pil_kwargs={'compress_level': 1})
+    if close:
+        plt.close(fig)
     logger.info(f"Gráfico salvo: {filepath}")
 
 
-def plot_time_series_open_debt_total(temporal_df: pd.DataFrame, output_dir: str):
+def time_series_axes(ax=None):
+    """
+    Retorna (fig, ax) para um gráfico de série temporal.
+    Reutiliza os eixos informados (limpando-os) ou cria uma nova figura 12x6.
+    
+    Args:
+        ax: Eixos a reutilizar (opcional)
+        
+    Returns:
+        Tupla (figura, eixos)
+    """
+    if ax is None:
+        return plt.subplots(figsize=(12, 6), constrained_layout=True)
+    ax.clear()
+    return ax.figure, ax
+
+
+def build_debtor_labels(ranking_df: pd.DataFrame, max_len: int = 30) -> list:
+    """
+    Monta rótulos "pena_agua - nome" para os gráficos de ranking.
+    Nomes maiores que max_len são truncados com reticências.
+    
+    Args:
+        ranking_df: DataFrame com colunas pena_agua e nome
+        max_len: Tamanho máximo do nome exibido
+        
+    Returns:
+        Lista de rótulos
+    """
+    nomes = ranking_df['nome'].astype(str)
+    nomes_display = nomes.where(nomes.str.len() <= max_len, nomes.str.slice(0, max_len) + '...')
+    return (ranking_df['pena_agua'].astype(str) + ' - ' + nomes_display).tolist()
+
+
+def plot_time_series_open_debt_total(temporal_df: pd.DataFrame, charts_dir: Path, ax=None):
     """
     Gráfico de linha: dívida total em aberto por mês.
     
     Args:
         temporal_df: DataFrame com evolução temporal
-        output_dir: Diretório de saída
+        charts_dir: Diretório dos gráficos (já criado)
+        ax: Eixos 12x6 a reutilizar (opcional; a figura não é fechada)
     """
     if len(temporal_df) == 0:
         logger.warning("Sem dados para gráfico de dívida total")
         return
     
-    fig, ax = plt.subplots(figsize=(12, 6))
+    reuse_fig = ax is not None
+    fig, ax = time_series_axes(ax)
     
     ax.plot(temporal_df['mes_referencia'], temporal_df['soma_divida_open'], 
             marker='o', linewidth=2, markersize=8, color='#d32f2f')
@@ -62,23 +99,24 @@ def plot_time_series_open_debt_total(temporal_df: pd.DataFrame, output_dir: str)
     # Formatar eixo Y como moeda
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'R$ {x:,.0f}'))
     
-    plt.tight_layout()
-    save_chart(fig, output_dir, 'time_series_open_debt_total.png')
+    save_chart(fig, charts_dir, 'time_series_open_debt_total.png', close=not reuse_fig)
 
 
-def plot_time_series_open_debtors_count(temporal_df: pd.DataFrame, output_dir: str):
+def plot_time_series_open_debtors_count(temporal_df: pd.DataFrame, charts_dir: Path, ax=None):
     """
     Gráfico de linha: quantidade de devedores únicos em aberto por mês.
     
     Args:
         temporal_df: DataFrame com evolução temporal
-        output_dir: Diretório de saída
+        charts_dir: Diretório dos gráficos (já criado)
+        ax: Eixos 12x6 a reutilizar (opcional; a figura não é fechada)
     """
     if len(temporal_df) == 0:
         logger.warning("Sem dados para gráfico de devedores")
         return
     
-    fig, ax = plt.subplots(figsize=(12, 6))
+    reuse_fig = ax is not None
+    fig, ax = time_series_axes(ax)
     
     ax.plot(temporal_df['mes_referencia'], temporal_df['qtd_devedores_open_unicos'], 
             marker='s', linewidth=2, markersize=8, color='#f57c00')
@@ -88,23 +126,24 @@ def plot_time_series_open_debtors_count(temporal_df: pd.DataFrame, output_dir: s
     ax.grid(True, alpha=0.3)
     ax.tick_params(axis='x', rotation=45)
     
-    plt.tight_layout()
-    save_chart(fig, output_dir, 'time_series_open_debtors_count.png')
+    save_chart(fig, charts_dir, 'time_series_open_debtors_count.png', close=not reuse_fig)
 
 
-def plot_time_series_open_bills_count(temporal_df: pd.DataFrame, output_dir: str):
+def plot_time_series_open_bills_count(temporal_df: pd.DataFrame, charts_dir: Path, ax=None):
     """
     Gráfico de linha: quantidade de boletos em aberto por mês.
     
     Args:
         temporal_df: DataFrame com evolução temporal
-        output_dir: Diretório de saída
+        charts_dir: Diretório dos gráficos (já criado)
+        ax: Eixos 12x6 a reutilizar (opcional; a figura não é fechada)
     """
     if len(temporal_df) == 0:
         logger.warning("Sem dados para gráfico de boletos")
         return
     
-    fig, ax = plt.subplots(figsize=(12, 6))
+    reuse_fig = ax is not None
+    fig, ax = time_series_axes(ax)
     
     ax.plot(temporal_df['mes_referencia'], temporal_df['qtd_boletos_open'], 
             marker='^', linewidth=2, markersize=8, color='#7b1fa2')
@@ -114,23 +153,24 @@ def plot_time_series_open_bills_count(temporal_df: pd.DataFrame, output_dir: str
     ax.grid(True, alpha=0.3)
     ax.tick_params(axis='x', rotation=45)
     
-    plt.tight_layout()
-    save_chart(fig, output_dir, 'time_series_open_bills_count.png')
+    save_chart(fig, charts_dir, 'time_series_open_bills_count.png', close=not reuse_fig)
 
 
-def plot_time_series_open_mean_value(temporal_df: pd.DataFrame, output_dir: str):
+def plot_time_series_open_mean_value(temporal_df: pd.DataFrame, charts_dir: Path, ax=None):
     """
     Gráfico de linha: média do valor em aberto por mês.
     
     Args:
         temporal_df: DataFrame com evolução temporal
-        output_dir: Diretório de saída
+        charts_dir: Diretório dos gráficos (já criado)
+        ax: Eixos 12x6 a reutilizar (opcional; a figura não é fechada)
     """
     if len(temporal_df) == 0:
         logger.warning("Sem dados para gráfico de média")
         return
     
-    fig, ax = plt.subplots(figsize=(12, 6))
+    reuse_fig = ax is not None
+    fig, ax = time_series_axes(ax)
     
     ax.plot(temporal_df['mes_referencia'], temporal_df['valor_medio_open'], 
             marker='d', linewidth=2, markersize=8, color='#388e3c')
@@ -143,30 +183,48 @@ def plot_time_series_open_mean_value(temporal_df: pd.DataFrame, output_dir: str)
     # Formatar eixo Y como moeda
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'R$ {x:,.2f}'))
     
-    plt.tight_layout()
-    save_chart(fig, output_dir, 'time_series_open_mean_value.png')
+    save_chart(fig, charts_dir, 'time_series_open_mean_value.png', close=not reuse_fig)
+
+
+def plot_all_time_series(temporal_df: pd.DataFrame, charts_dir: Path):
+    """
+    Gera os quatro gráficos de série temporal reutilizando uma única figura.
+    
+    Args:
+        temporal_df: DataFrame com evolução temporal
+        charts_dir: Diretório dos gráficos (já criado)
+    """
+    if len(temporal_df) == 0:
+        logger.warning("Sem dados para gráficos de série temporal")
+        return
+    
+    fig, ax = time_series_axes()
+    try:
+        plot_time_series_open_debt_total(temporal_df, charts_dir, ax=ax)
+        plot_time_series_open_debtors_count(temporal_df, charts_dir, ax=ax)
+        plot_time_series_open_bills_count(temporal_df, charts_dir, ax=ax)
+        plot_time_series_open_mean_value(temporal_df, charts_dir, ax=ax)
+    finally:
+        plt.close(fig)
 
 
-def plot_bar_top10_debtors_total(ranking_df: pd.DataFrame, output_dir: str):
+def plot_bar_top10_debtors_total(ranking_df: pd.DataFrame, charts_dir: Path):
     """
     Gráfico de barras: top 10 devedores por dívida total.
     
     Args:
         ranking_df: DataFrame com ranking
-        output_dir: Diretório de saída
+        charts_dir: Diretório dos gráficos (já criado)
     """
     if len(ranking_df) == 0:
         logger.warning("Sem dados para gráfico de ranking")
         return
     
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    # Limitar nomes para exibição
-    nomes_display = ranking_df['nome'].apply(lambda x: x[:30] + '...' if len(x) > 30 else x)
+    fig, ax = plt.subplots(figsize=(12, 8), constrained_layout=True)
     
-    bars = ax.barh(range(len(ranking_df)), ranking_df['divida_total'], color='#d32f2f')
+    bars = ax.barh(range(len(ranking_df)), ranking_df['divida_total'], color='#d32f2f', rasterized=True)
     ax.set_yticks(range(len(ranking_df)))
-    labels = [f"{row['pena_agua']} - {nome}" for (_, row), nome in zip(ranking_df.iterrows(), nomes_display)]
+    labels = build_debtor_labels(ranking_df)
     ax.set_yticklabels(labels, fontsize=9)
     ax.set_xlabel('Dívida Total (R$)', fontsize=12)
     ax.set_title('Top 10 Devedores por Dívida Total', fontsize=14, fontweight='bold')
@@ -178,30 +236,26 @@ def plot_bar_top10_debtors_total(ranking_df: pd.DataFrame, output_dir: str):
     # Inverter eixo Y para maior no topo
     ax.invert_yaxis()
     
-    plt.tight_layout()
-    save_chart(fig, output_dir, 'bar_top10_debtors_total.png')
+    save_chart(fig, charts_dir, 'bar_top10_debtors_total.png')
 
 
-def plot_bar_top10_debtors_recurrence(recurrence_df: pd.DataFrame, output_dir: str):
+def plot_bar_top10_debtors_recurrence(recurrence_df: pd.DataFrame, charts_dir: Path):
     """
     Gráfico de barras: top 10 reincidentes (por quantidade de boletos).
     
     Args:
         recurrence_df: DataFrame com ranking de reincidência
-        output_dir: Diretório de saída
+        charts_dir: Diretório dos gráficos (já criado)
     """
     if len(recurrence_df) == 0:
         logger.warning("Sem dados para gráfico de reincidência")
         return
     
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    # Limitar nomes para exibição
-    nomes_display = recurrence_df['nome'].apply(lambda x: x[:30] + '...' if len(x) > 30 else x)
+    fig, ax = plt.subplots(figsize=(12, 8), constrained_layout=True)
     
-    bars = ax.barh(range(len(recurrence_df)), recurrence_df['qtd_boletos_open'], color='#f57c00')
+    bars = ax.barh(range(len(recurrence_df)), recurrence_df['qtd_boletos_open'], color='#f57c00', rasterized=True)
     ax.set_yticks(range(len(recurrence_df)))
-    labels = [f"{row['pena_agua']} - {nome}" for (_, row), nome in zip(recurrence_df.iterrows(), nomes_display)]
+    labels = build_debtor_labels(recurrence_df)
     ax.set_yticklabels(labels, fontsize=9)
     ax.set_xlabel('Quantidade de Boletos em Aberto', fontsize=12)
     ax.set_title('Top 10 Devedores por Reincidência', fontsize=14, fontweight='bold')
@@ -210,32 +264,38 @@ def plot_bar_top10_debtors_recurrence(recurrence_df: pd.DataFrame, output_dir: s
     # Inverter eixo Y para maior no topo
     ax.invert_yaxis()
     
-    plt.tight_layout()
-    save_chart(fig, output_dir, 'bar_top10_debtors_recurrence.png')
+    save_chart(fig, charts_dir, 'bar_top10_debtors_recurrence.png')
 
 
-def plot_boxplot_open_values_by_month(df: pd.DataFrame, output_dir: str):
+def plot_boxplot_open_values_by_month(df_open_valid: pd.DataFrame, charts_dir: Path):
     """
     Boxplot: distribuição de valores em aberto por mês.
     
     Args:
-        df: DataFrame com dados limpos
-        output_dir: Diretório de saída
+        df_open_valid: Boletos OPEN com valor válido (colunas mes_referencia e valor_float)
+        charts_dir: Diretório dos gráficos (já criado)
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
-    df_open_valid = df_open[df_open['valor_valido']].copy()
-    
     if len(df_open_valid) == 0:
         logger.warning("Sem dados para boxplot")
         return
     
-    fig, ax = plt.subplots(figsize=(14, 8))
+    fig, ax = plt.subplots(figsize=(14, 8), constrained_layout=True)
     
-    meses_ordenados = sorted(df_open_valid['mes_referencia'].unique())
-    data_by_month = [df_open_valid[df_open_valid['mes_referencia'] == mes]['valor_float'].values 
-                     for mes in meses_ordenados]
+    # Particionar os valores por mês em uma única passada (grupos já ordenados)
+    meses_ordenados = []
+    data_by_month = []
+    for mes, valores in df_open_valid.groupby('mes_referencia', sort=True, observed=True)['valor_float']:
+        meses_ordenados.append(mes)
+        data_by_month.append(valores.values)
     
-    bp = ax.boxplot(data_by_month, labels=meses_ordenados, patch_artist=True)
+    # Estatísticas (quartis, whiskers, outliers) calculadas uma vez e desenhadas com bxp
+    stats = cbook.boxplot_stats(data_by_month, labels=meses_ordenados)
+    bp = ax.bxp(stats, patch_artist=True)
+    
+    # Rasterizar apenas os elementos de dados (eixos e textos continuam vetoriais)
+    for artists in bp.values():
+        for artist in artists:
+            artist.set_rasterized(True)
     
     # Colorir boxes
     for patch in bp['boxes']:
@@ -251,28 +311,24 @@ def plot_boxplot_open_values_by_month(df: pd.DataFrame, output_dir: str):
     # Formatar eixo Y como moeda
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'R$ {x:,.0f}'))
     
-    plt.tight_layout()
-    save_chart(fig, output_dir, 'boxplot_open_values_by_month.png')
+    save_chart(fig, charts_dir, 'boxplot_open_values_by_month.png')
 
 
-def plot_hist_open_values(df: pd.DataFrame, output_dir: str):
+def plot_hist_open_values(df_open_valid: pd.DataFrame, charts_dir: Path):
     """
     Histograma: distribuição de valores em aberto.
     
     Args:
-        df: DataFrame com dados limpos
-        output_dir: Diretório de saída
+        df_open_valid: Boletos OPEN com valor válido (coluna valor_float)
+        charts_dir: Diretório dos gráficos (já criado)
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
-    df_open_valid = df_open[df_open['valor_valido']].copy()
-    
     if len(df_open_valid) == 0:
         logger.warning("Sem dados para histograma")
         return
     
-    fig, ax = plt.subplots(figsize=(12, 6))
+    fig, ax = plt.subplots(figsize=(12, 6), constrained_layout=True)
     
-    ax.hist(df_open_valid['valor_float'], bins=50, color='#5c6bc0', alpha=0.7, edgecolor='black')
+    ax.hist(df_open_valid['valor_float'], bins=50, color='#5c6bc0', alpha=0.7, edgecolor='black', rasterized=True)
     ax.set_xlabel('Valor em Aberto (R$)', fontsize=12)
     ax.set_ylabel('Frequência', fontsize=12)
     ax.set_title('Distribuição de Valores em Aberto', fontsize=14, fontweight='bold')
@@ -281,8 +337,13 @@ def plot_hist_open_values(df: pd.DataFrame, output_dir: str):
     # Formatar eixo X como moeda
     ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'R$ {x:,.0f}'))
     
-    plt.tight_layout()
-    save_chart(fig, output_dir, 'hist_open_values.png')
+    save_chart(fig, charts_dir, 'hist_open_values.png')
+
+
+def init_chart_worker():
+    """Inicializa a thread de geração de gráficos com backend sem interface (Agg)."""
+    import matplotlib
+    matplotlib.use('Agg')
 
 
 def generate_all_charts(df: pd.DataFrame, temporal_df: pd.DataFrame, 
@@ -299,14 +360,25 @@ def generate_all_charts(df: pd.DataFrame, temporal_df: pd.DataFrame,
         output_dir: Diretório de saída
     """
     logger.info("Gerando gráficos...")
-    
-    plot_time_series_open_debt_total(temporal_df, output_dir)
-    plot_time_series_open_debtors_count(temporal_df, output_dir)
-    plot_time_series_open_bills_count(temporal_df, output_dir)
-    plot_time_series_open_mean_value(temporal_df, output_dir)
-    plot_bar_top10_debtors_total(ranking_total, output_dir)
-    plot_bar_top10_debtors_recurrence(ranking_recurrence, output_dir)
-    plot_boxplot_open_values_by_month(df, output_dir)
-    plot_hist_open_values(df, output_dir)
+    charts_dir = Path(output_dir) / "charts"
+    charts_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Boletos OPEN com valor válido, filtrados uma única vez para o boxplot e o
+    # histograma, apenas com as colunas usadas. float32 basta para desenhar e
+    # reduz pela metade o volume de valores; os cálculos e exportações
+    # continuam usando valor_float em float64.
+    if len(df) == 0 or 'status_categoria' not in df.columns:
+        df_open_valid = pd.DataFrame(columns=['mes_referencia', 'valor_float'])
+    else:
+        mask_open_valid = (df['status_categoria'] == 'OPEN') & df['valor_valido']
+        df_open_valid = df.loc[mask_open_valid, ['mes_referencia', 'valor_float']].astype(
+            {'valor_float': 'float32'}
+        )
+    
+    plot_all_time_series(temporal_df, charts_dir)
+    plot_bar_top10_debtors_total(ranking_total, charts_dir)
+    plot_bar_top10_debtors_recurrence(ranking_recurrence, charts_dir)
+    plot_boxplot_open_values_by_month(df_open_valid, charts_dir)
+    plot_hist_open_values(df_open_valid, charts_dir)
     
     logger.info("Todos os gráficos gerados com sucesso")
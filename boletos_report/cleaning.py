@@ -5,12 +5,28 @@ Limpeza e conversão de dados: valores, datas, extração de pena_agua, etc.
 import re
 import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import Tuple, Optional
 import pandas as pd
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Formatos de data aceitos, na ordem em que são tentados
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+
+# Ordem de prioridade dos status ao escolher a linha mantida na deduplicação
+STATUS_PRIORIDADE = ("OPEN", "PAID", "OTHER")
+
+# Textos que representam valor ausente após conversão para string
+VALORES_AUSENTES = ("", "nan", "none")
+
+# Colunas de baixa cardinalidade convertidas para category ao fim da limpeza
+COLUNAS_CATEGORICAS = ("pena_agua", "mes_referencia", "banco", "status_norm", "status_categoria")
+
+# Dígitos no início do nome do pagador (pena_agua) seguidos do nome
+PENA_AGUA_REGEX = re.compile(r"^\s*(\d+)\s*(.*)$")
+
 
 def parse_valor(valor_str: any) -> Tuple[float, bool]:
     """
@@ -32,10 +48,26 @@ def parse_valor(valor_str: any) -> Tuple[float, bool]:
     if not isinstance(valor_str, str):
         return (0.0, False)
     
+    return _parse_valor_texto(valor_str)
+
+
+@lru_cache(maxsize=200_000)
+def _parse_valor_texto(valor_str: str) -> Tuple[float, bool]:
+    """
+    Converte um valor em texto para float (resultado memorizado por string).
+    
+    Args:
+        valor_str: Valor como string
+        
+    Returns:
+        Tupla (valor_float, sucesso)
+    """
     # Remove espaços e caracteres não numéricos exceto ponto e vírgula
     valor_clean = valor_str.strip().replace(" ", "")
     
-    if not valor_clean:
+    # Mesmas regras do parser do pandas usado em parse_valor_series: apenas
+    # dígitos ASCII e sem '_' (que float() aceitaria)
+    if not valor_clean or not valor_clean.isascii() or '_' in valor_clean:
         return (0.0, False)
     
     try:
@@ -58,6 +90,9 @@ def parse_valor(valor_str: any) -> Tuple[float, bool]:
             # Caso contrário, mantém o ponto como decimal
         
         valor_float = float(valor_clean)
+        # O texto "nan" é valor ausente, não um número
+        if np.isnan(valor_float):
+            return (0.0, False)
         return (valor_float, True)
     
     except (ValueError, AttributeError) as e:
@@ -88,36 +123,129 @@ def parse_data(data_str: any) -> Tuple[Optional[datetime], bool]:
     if not isinstance(data_str, str):
         return (None, False)
     
+    return _parse_data_texto(data_str)
+
+
+@lru_cache(maxsize=200_000)
+def _parse_data_texto(data_str: str) -> Tuple[Optional[datetime], bool]:
+    """
+    Converte uma data em texto para datetime (resultado memorizado por string).
+    
+    Args:
+        data_str: Data como string
+        
+    Returns:
+        Tupla (datetime_object, sucesso)
+    """
     data_clean = data_str.strip()
     
     if not data_clean:
         return (None, False)
     
-    # Tentar formato YYYY-MM-DD
-    try:
-        dt = datetime.strptime(data_clean, "%Y-%m-%d")
-        return (dt, True)
-    except ValueError:
-        pass
+    # Cada formato exige um separador: escolher pela forma do texto evita
+    # tentativas de strptime que só terminariam em exceção
+    if "/" in data_clean:
+        formatos = (DATE_FORMATS[1],)
+    elif data_clean[4:5] == "-":
+        formatos = (DATE_FORMATS[0], DATE_FORMATS[2])
+    else:
+        formatos = (DATE_FORMATS[2], DATE_FORMATS[0])
     
-    # Tentar formato DD/MM/YYYY
-    try:
-        dt = datetime.strptime(data_clean, "%d/%m/%Y")
-        return (dt, True)
-    except ValueError:
-        pass
-    
-    # Tentar formato DD-MM-YYYY
-    try:
-        dt = datetime.strptime(data_clean, "%d-%m-%Y")
-        return (dt, True)
-    except ValueError:
-        pass
+    for formato in formatos:
+        try:
+            return (datetime.strptime(data_clean, formato), True)
+        except ValueError:
+            continue
     
     logger.debug(f"Formato de data não reconhecido: '{data_str}'")
     return (None, False)
 
 
+def parse_valor_series(valores: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Versão vetorizada de parse_valor para uma coluna inteira.
+    Valores que o pandas já converte direto (ex: "1161.41") não passam pelo
+    tratamento de separadores; os demais seguem as mesmas regras de parse_valor.
+    
+    Args:
+        valores: Série com valores como string ou número
+        
+    Returns:
+        Tupla (série de floats, série booleana de sucesso)
+    """
+    # Caminho rápido: números e textos já no formato "1161.41"/"1000" são
+    # convertidos direto pelo parser em C do pandas
+    convertidos = pd.to_numeric(valores, errors='coerce')
+    
+    # Apenas as linhas restantes passam pelas regras de separadores
+    pendentes = convertidos.isna() & valores.notna()
+    if pendentes.any():
+        texto = valores[pendentes].astype(str).str.strip().str.replace(" ", "", regex=False)
+        
+        # Se tem vírgula, assume formato brasileiro (1.234,56)
+        tem_virgula = texto.str.contains(",", regex=False)
+        # Se tem mais de um ponto (sem vírgula), os pontos são separadores de milhar
+        # (contagem pela diferença de tamanho sem os pontos, sem regex)
+        sem_pontos = texto.str.replace(".", "", regex=False)
+        multiplos_pontos = ~tem_virgula & ((texto.str.len() - sem_pontos.str.len()) > 1)
+        
+        texto = texto.mask(tem_virgula, sem_pontos.str.replace(",", ".", regex=False))
+        texto = texto.mask(multiplos_pontos, sem_pontos)
+        
+        convertidos = convertidos.fillna(pd.to_numeric(texto, errors='coerce'))
+    
+    sucesso = convertidos.notna()
+    return (convertidos.fillna(0.0).astype(float), sucesso)
+
+
+def parse_data_series(datas: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Versão vetorizada de parse_data para uma coluna inteira.
+    Tenta os formatos YYYY-MM-DD, DD/MM/YYYY e DD-MM-YYYY, nessa ordem.
+    
+    Args:
+        datas: Série com datas como string
+        
+    Returns:
+        Tupla (série datetime64, série booleana de sucesso)
+    """
+    if pd.api.types.is_datetime64_any_dtype(datas):
+        return (datas, datas.notna())
+    
+    if pd.api.types.is_numeric_dtype(datas):
+        # Coluna numérica (ex: só NaN, ou 20251015 lido como inteiro): não há
+        # texto a converter e, como em parse_data, nenhuma data é válida
+        texto = pd.Series(None, index=datas.index, dtype=object)
+    else:
+        texto = datas.str.strip()
+    
+    # Muitos boletos compartilham o mesmo vencimento: cada texto distinto é
+    # convertido uma única vez e o resultado é mapeado de volta para as linhas
+    unicos = pd.Series(texto.dropna().unique(), dtype=object)
+    convertidas_unicas = pd.to_datetime(unicos, format=DATE_FORMATS[0], errors='coerce')
+    
+    for formato in DATE_FORMATS[1:]:
+        faltantes = convertidas_unicas.isna()
+        if not faltantes.any():
+            break
+        convertidas_unicas = convertidas_unicas.fillna(
+            pd.to_datetime(unicos.where(faltantes), format=formato, errors='coerce')
+        )
+    
+    convertidas = texto.map(pd.Series(convertidas_unicas.to_numpy(), index=unicos))
+    convertidas = convertidas.astype('datetime64[ns]')
+    
+    # Objetos datetime/Timestamp já convertidos em colunas mistas
+    nao_texto = texto.isna() & datas.notna()
+    if nao_texto.any():
+        ja_datas = datas.where(nao_texto).map(
+            lambda x: x if isinstance(x, datetime) else None
+        )
+        convertidas = convertidas.fillna(pd.to_datetime(ja_datas, errors='coerce'))
+    
+    return (convertidas, convertidas.notna())
+
+
 def extract_pena_agua_from_name(nome_pagador: str) -> Tuple[Optional[str], str]:
     """
     Extrai pena_agua do início do nome_pagador usando regex.
@@ -135,7 +263,7 @@ def extract_pena_agua_from_name(nome_pagador: str) -> Tuple[Optional[str], str]:
     nome_clean = nome_pagador.strip()
     
     # Regex para extrair dígitos no início
-    match = re.match(r"^\s*(\d+)\s*(.*)$", nome_clean)
+    match = PENA_AGUA_REGEX.match(nome_clean)
     
     if match:
         pena_agua = match.group(1)
@@ -167,6 +295,27 @@ def derive_mes_referencia(data_vencimento: datetime) -> Optional[str]:
     return None
 
 
+def _chave_prioridade_status(coluna: pd.Series) -> pd.Series:
+    """
+    Chave de ordenação que troca status_categoria pela sua prioridade
+    (OPEN, PAID, OTHER e, por último, qualquer outro valor).
+    
+    Args:
+        coluna: Coluna sendo ordenada
+        
+    Returns:
+        Códigos inteiros de prioridade, ou a própria coluna se não for status
+    """
+    if coluna.name != 'status_categoria':
+        return coluna
+    
+    # Códigos int8 (-1 para status fora da lista, que vão para o fim);
+    # se a coluna já for category, só os códigos são remapeados
+    codigos = pd.Categorical(coluna, categories=STATUS_PRIORIDADE).codes
+    codigos = np.where(codigos < 0, np.int8(len(STATUS_PRIORIDADE)), codigos)
+    return pd.Series(codigos, index=coluna.index)
+
+
 def remove_duplicates_by_pena_month(df: pd.DataFrame) -> pd.DataFrame:
     """
     Remove duplicatas de pena_agua no mesmo mês.
@@ -179,71 +328,70 @@ def remove_duplicates_by_pena_month(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame sem duplicatas de pena_agua por mês
     """
-    df = df.copy()
-    
     # Filtrar apenas linhas com pena_agua e mes_referencia válidos
     # (não vazios, não None, não 'nan', não 'None')
-    pena_str = df['pena_agua'].astype(str).str.strip()
-    mes_str = df['mes_referencia'].astype(str).str.strip()
+    pena_str = df['pena_agua'].astype(str).str.strip().str.lower()
+    mes_str = df['mes_referencia'].astype(str).str.strip().str.lower()
     
     mask_valido = (
         df['pena_agua'].notna() & 
-        (pena_str != '') &
-        (pena_str.str.lower() != 'nan') &
-        (pena_str.str.lower() != 'none') &
+        ~pena_str.isin(VALORES_AUSENTES) &
         df['mes_referencia'].notna() &
-        (mes_str != '') &
-        (mes_str.str.lower() != 'nan') &
-        (mes_str.str.lower() != 'none')
-    )
-    
-    df_validos = df[mask_valido].copy()
-    df_invalidos = df[~mask_valido].copy()
+        ~mes_str.isin(VALORES_AUSENTES)
+    ).to_numpy()
     
-    if len(df_validos) == 0:
+    if not mask_valido.any():
         logger.info("Nenhuma linha válida com pena_agua e mes_referencia para deduplicação")
-        return df
+        return df.copy()
+    
+    # Só as colunas de chave/ordenação das linhas válidas são copiadas,
+    # indexadas pela posição da linha em df
+    if 'status_categoria' in df.columns:
+        sort_cols = ['pena_agua', 'mes_referencia', 'status_categoria', 'valor_float']
+        ascending = [True, True, True, False]
+    else:
+        sort_cols = ['pena_agua', 'mes_referencia', 'valor_float']
+        ascending = [True, True, False]
+    
+    posicoes_validas = np.flatnonzero(mask_valido)
+    chaves = df.iloc[posicoes_validas][['pena_agua', 'mes_referencia']]
+    chaves.index = posicoes_validas
     
     # Contar duplicatas antes da remoção
-    duplicatas = df_validos.duplicated(subset=['pena_agua', 'mes_referencia'], keep=False)
+    duplicatas = chaves.duplicated(keep=False)
     qtd_duplicatas = duplicatas.sum()
     
     if qtd_duplicatas > 0:
         logger.info(f"Encontradas {qtd_duplicatas} linhas com duplicatas de pena_agua no mesmo mês")
         
         # Ordenar para garantir consistência: priorizar OPEN, depois por valor decrescente
-        # Criar coluna temporária para ordenação
-        if 'status_categoria' in df_validos.columns:
-            df_validos['_priority'] = df_validos['status_categoria'].map({'OPEN': 1, 'PAID': 2, 'OTHER': 3}).fillna(4)
-            sort_cols = ['pena_agua', 'mes_referencia', '_priority', 'valor_float']
-            ascending = [True, True, True, False]
-        else:
-            df_validos['_priority'] = 4  # Sem status, menor prioridade
-            sort_cols = ['pena_agua', 'mes_referencia', 'valor_float']
-            ascending = [True, True, False]
-        
-        df_validos = df_validos.sort_values(sort_cols, ascending=ascending)
+        # (a prioridade do status é usada como chave de ordenação, sem coluna temporária)
+        ordenacao = df.iloc[posicoes_validas][sort_cols]
+        ordenacao.index = posicoes_validas
+        ordenacao = ordenacao.sort_values(sort_cols, ascending=ascending, key=_chave_prioridade_status)
         
         # Contar quantas linhas serão mantidas após remoção
-        qtd_antes = len(df_validos)
-        
-        # Remover duplicatas mantendo a primeira (que agora é a priorizada)
-        df_validos = df_validos.drop_duplicates(subset=['pena_agua', 'mes_referencia'], keep='first')
+        qtd_antes = len(ordenacao)
         
-        # Remover coluna temporária
-        df_validos = df_validos.drop(columns=['_priority'])
+        # Remover duplicatas mantendo a primeira (que agora é a priorizada):
+        # com os dados ordenados, as repetições são consecutivas e basta
+        # comparar cada linha com a anterior, sem montar tabela hash
+        pena = ordenacao['pena_agua'].to_numpy()
+        mes = ordenacao['mes_referencia'].to_numpy()
+        primeira = np.ones(len(ordenacao), dtype=bool)
+        primeira[1:] = (pena[1:] != pena[:-1]) | (mes[1:] != mes[:-1])
+        posicoes_validas = ordenacao.index.to_numpy()[primeira]
         
-        qtd_depois = len(df_validos)
+        qtd_depois = len(posicoes_validas)
         qtd_removidas = qtd_antes - qtd_depois
         logger.info(f"Removidas {qtd_removidas} linhas duplicadas de pena_agua no mesmo mês")
     else:
         logger.info("Nenhuma duplicata de pena_agua no mesmo mês encontrada")
     
-    # Reconcatenar linhas válidas (já deduplicadas) com inválidas
-    if len(df_invalidos) > 0:
-        df_final = pd.concat([df_validos, df_invalidos], ignore_index=True)
-    else:
-        df_final = df_validos
+    # Linhas válidas (já deduplicadas) seguidas das inválidas, montadas com
+    # um único take em vez de cópias separadas + concat
+    ordem = np.concatenate([posicoes_validas, np.flatnonzero(~mask_valido)])
+    df_final = df.take(ordem).reset_index(drop=True)
     
     logger.info(f"Total de linhas após remoção de duplicatas: {len(df_final)} (antes: {len(df)})")
     
@@ -261,81 +409,90 @@ def clean_dataframe(df: pd.DataFrame, status_classifier) -> pd.DataFrame:
     Returns:
         DataFrame limpo com colunas adicionais
     """
-    df = df.copy()
+    # Cópia rasa: colunas novas ou substituídas por inteiro não afetam o
+    # DataFrame de entrada, e os dados brutos não são duplicados na memória
+    df = df.copy(deep=False)
     
     # Converter valores
     logger.info("Convertendo valores...")
-    valor_results = df['valor'].apply(parse_valor)
-    df['valor_float'] = [v[0] for v in valor_results]
-    df['valor_valido'] = [v[1] for v in valor_results]
+    df['valor_float'], df['valor_valido'] = parse_valor_series(df['valor'])
     
     # Converter datas
     logger.info("Convertendo datas...")
-    data_results = df['data_vencimento'].apply(parse_data)
-    df['data_vencimento_dt'] = [d[0] for d in data_results]
-    df['data_valida'] = [d[1] for d in data_results]
+    df['data_vencimento_dt'], df['data_valida'] = parse_data_series(df['data_vencimento'])
     
     # Extrair pena_agua se faltar
     logger.info("Extraindo pena_agua...")
     if 'pena_agua' not in df.columns or df['pena_agua'].isna().all():
         df['pena_agua'] = None
     
+    # Texto normalizado calculado uma única vez: serve para a máscara e
+    # como valor final (só as linhas preenchidas são atualizadas depois)
+    pena_texto = df['pena_agua'].astype(str).str.strip()
+
     # Preencher pena_agua faltante a partir do nome
-    mask_pena_faltante = df['pena_agua'].isna() | (df['pena_agua'].astype(str).str.strip() == "")
+    mask_pena_faltante = df['pena_agua'].isna() | (pena_texto == "")
+    # Sem nome não há de onde extrair: essas linhas nem entram no regex
+    mask_pena_faltante &= df['nome_pagador'].notna()
     if mask_pena_faltante.any():
-        for idx in df[mask_pena_faltante].index:
-            nome = df.loc[idx, 'nome_pagador']
-            pena, nome_limpo = extract_pena_agua_from_name(nome)
-            if pena:
-                df.loc[idx, 'pena_agua'] = pena
-                df.loc[idx, 'nome_pagador'] = nome_limpo
-    
+        extraido = df.loc[mask_pena_faltante, 'nome_pagador'].str.strip().str.extract(PENA_AGUA_REGEX)
+        mask_extraido = extraido[0].notna().reindex(df.index, fill_value=False)
+        if mask_extraido.any():
+            extraido = extraido[extraido[0].notna()]
+            pena_texto[mask_extraido] = extraido[0].to_numpy()
+            nome_pagador = df['nome_pagador'].copy()
+            nome_pagador[mask_extraido] = extraido[1].str.strip().to_numpy()
+            df['nome_pagador'] = nome_pagador
+
     # Converter pena_agua para string
-    df['pena_agua'] = df['pena_agua'].astype(str).str.strip()
-    
+    df['pena_agua'] = pena_texto
+
     # Derivar mes_referencia se faltar
     logger.info("Derivando mes_referencia...")
     if 'mes_referencia' not in df.columns:
         df['mes_referencia'] = None
-    
-    mask_mes_faltante = df['mes_referencia'].isna() | (df['mes_referencia'].astype(str).str.strip() == "")
+
+    mes_texto = df['mes_referencia'].astype(str).str.strip()
+    mask_mes_faltante = df['mes_referencia'].isna() | (mes_texto == "")
+    mask_mes_faltante &= df['data_vencimento_dt'].notna()
     if mask_mes_faltante.any():
-        for idx in df[mask_mes_faltante].index:
-            data = df.loc[idx, 'data_vencimento_dt']
-            if data:
-                mes_ref = derive_mes_referencia(data)
-                if mes_ref:
-                    df.loc[idx, 'mes_referencia'] = mes_ref
-    
+        # Truncar para datetime64[M] e formatar em C (equivale a strftime("%Y-%m"))
+        meses = df.loc[mask_mes_faltante, 'data_vencimento_dt'].to_numpy().astype('datetime64[M]')
+        mes_texto[mask_mes_faltante] = np.datetime_as_string(meses, unit='M')
+
     # Normalizar mes_referencia para YYYY-MM
-    df['mes_referencia'] = df['mes_referencia'].astype(str).str.strip()
+    df['mes_referencia'] = mes_texto
     
     # Classificar status
     logger.info("Classificando status...")
-    status_results = df['status'].apply(status_classifier.classify)
-    df['status_norm'] = [s[0] for s in status_results]
-    df['status_categoria'] = [s[1] for s in status_results]
+    df['status_norm'], df['status_categoria'] = status_classifier.classify_series(df['status'])
+    
+    # Normalizar nome (reutilizado no person_id); cada nome distinto é
+    # normalizado uma única vez e o resultado é mapeado para as linhas
+    from boletos_report.utils import normalize_name
+    nomes_unicos = df['nome_pagador'].dropna().unique()
+    nome_norm = df['nome_pagador'].map(
+        {nome: normalize_name(nome, remove_accents_flag=True) for nome in nomes_unicos}
+    ).fillna(normalize_name(None))
     
-    # Criar person_id
+    # Criar person_id: pena_agua|nome_normalizado (mesmo formato de create_person_id)
     logger.info("Criando person_id...")
-    from boletos_report.utils import create_person_id
-    df['person_id'] = df.apply(
-        lambda row: create_person_id(row['pena_agua'], row['nome_pagador']),
-        axis=1
-    )
+    df['person_id'] = df['pena_agua'].str.cat(nome_norm, sep="|")
     
     # Normalizar outros campos
     if 'banco' in df.columns:
         df['banco'] = df['banco'].astype(str).str.strip().str.upper()
     
-    if 'nome_pagador' in df.columns:
-        from boletos_report.utils import normalize_name
-        df['nome_pagador_norm'] = df['nome_pagador'].apply(
-            lambda x: normalize_name(x, remove_accents_flag=True)
-        )
+    df['nome_pagador_norm'] = nome_norm
     
     # Remover duplicatas de pena_agua no mesmo mês
     logger.info("Removendo duplicatas de pena_agua no mesmo mês...")
     df = remove_duplicates_by_pena_month(df)
     
+    # Colunas de baixa cardinalidade como category: filtros (== 'OPEN') e
+    # groupby passam a comparar códigos inteiros em vez de strings
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
     return df
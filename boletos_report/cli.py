@@ -5,6 +5,7 @@ Interface de linha de comando (CLI) para o sistema de análise de inadimplência
 import argparse
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime
@@ -26,7 +27,7 @@ from boletos_report.recurrence import (
     get_top_recurrent_debtors,
     calculate_recurrence_by_month
 )
-from boletos_report.charts import generate_all_charts
+from boletos_report.charts import generate_all_charts, init_chart_worker
 from boletos_report.report_html import generate_html_report
 from boletos_report.export import export_all_summaries
 
@@ -214,9 +215,8 @@ def main():
         # Contar categorias
         if 'status_categoria' in df_clean.columns:
             status_counts = df_clean['status_categoria'].value_counts()
-            logger.info("Distribuição de status:")
-            for status, count in status_counts.items():
-                logger.info(f"  {status}: {count}")
+            status_counts.index.name = None
+            logger.info(f"Distribuição de status:\n{status_counts.to_string()}")
         
         # 4. Calcular métricas
         logger.info("=" * 60)
@@ -239,17 +239,22 @@ def main():
         logger.info("ETAPA 5: Analisando reincidência...")
         logger.info("=" * 60)
         recurrence_detail = calculate_recurrence(df_clean)
-        ranking_recurrence = get_top_recurrent_debtors(df_clean, top_n=args.top)
+        ranking_recurrence = get_top_recurrent_debtors(df_clean, top_n=args.top, recurrence=recurrence_detail)
         recurrence_by_month = calculate_recurrence_by_month(df_clean)
         
         logger.info(f"Total de devedores reincidentes: {len(recurrence_detail)}")
         
-        # 6. Gerar gráficos
+        # 6. Gerar gráficos (em segundo plano: HTML e exportações não
+        # dependem dos arquivos de gráfico e rodam enquanto eles são salvos)
+        charts_executor = None
+        charts_future = None
         if 'html' in formats or 'pdf' in formats:
             logger.info("=" * 60)
             logger.info("ETAPA 6: Gerando gráficos...")
             logger.info("=" * 60)
-            generate_all_charts(
+            charts_executor = ThreadPoolExecutor(max_workers=1, initializer=init_chart_worker)
+            charts_future = charts_executor.submit(
+                generate_all_charts,
                 df_clean,
                 temporal_df,
                 ranking_total,
@@ -257,42 +262,59 @@ def main():
                 str(output_path)
             )
         
-        # 7. Gerar relatório HTML
-        if 'html' in formats:
-            logger.info("=" * 60)
-            logger.info("ETAPA 7: Gerando relatório HTML...")
-            logger.info("=" * 60)
-            generate_html_report(
-                metrics,
-                metrics_by_bank,
-                max_min_boleto,
-                temporal_df,
-                ranking_total,
-                ranking_recurrence,
-                debt_change,
-                data_quality,
-                status_classifier,
-                df_clean,
-                str(output_path),
-                report_number
-            )
+        # A thread de gráficos é sempre encerrada, mesmo se o HTML ou as
+        # exportações falharem
+        try:
+            # 7. Gerar relatório HTML
+            if 'html' in formats:
+                logger.info("=" * 60)
+                logger.info("ETAPA 7: Gerando relatório HTML...")
+                logger.info("=" * 60)
+                generate_html_report(
+                    metrics,
+                    metrics_by_bank,
+                    max_min_boleto,
+                    temporal_df,
+                    ranking_total,
+                    ranking_recurrence,
+                    debt_change,
+                    data_quality,
+                    status_classifier,
+                    df_clean,
+                    str(output_path),
+                    report_number
+                )
+            
+            # 8. Exportar resumos
+            if 'csv' in formats or 'xlsx' in formats:
+                logger.info("=" * 60)
+                logger.info("ETAPA 8: Exportando resumos...")
+                logger.info("=" * 60)
+                export_all_summaries(
+                    df_clean,
+                    temporal_df,
+                    ranking_total,
+                    ranking_recurrence,
+                    recurrence_detail,
+                    debt_change,
+                    data_quality,
+                    str(output_path),
+                    formats,
+                    metrics_by_bank=metrics_by_bank
+                )
+        except Exception:
+            # Registrar um eventual erro dos gráficos, que de outra forma se
+            # perderia junto com o erro principal
+            if charts_future is not None and charts_future.exception() is not None:
+                logger.error(f"Erro ao gerar gráficos: {charts_future.exception()}")
+            raise
+        finally:
+            if charts_executor is not None:
+                charts_executor.shutdown()
         
-        # 8. Exportar resumos
-        if 'csv' in formats or 'xlsx' in formats:
-            logger.info("=" * 60)
-            logger.info("ETAPA 8: Exportando resumos...")
-            logger.info("=" * 60)
-            export_all_summaries(
-                df_clean,
-                temporal_df,
-                ranking_total,
-                ranking_recurrence,
-                recurrence_detail,
-                debt_change,
-                data_quality,
-                str(output_path),
-                formats
-            )
+        # Propagar eventuais erros da thread de gráficos
+        if charts_future is not None:
+            charts_future.result()
         
         # 9. Resumo final
         logger.info("=" * 60)
@@ -2,14 +2,17 @@
 Exportação de dados para CSV, XLSX e PDF.
 """
 
-import os
 import logging
 from pathlib import Path
 from typing import List, Optional
 import pandas as pd
 
+from boletos_report.metrics import get_df_open, get_top_n_positions
+
 logger = logging.getLogger(__name__)
 
+CSV_BUFFER_SIZE = 1 << 20
+
 
 def export_to_csv(df: pd.DataFrame, output_path: str):
     """
@@ -22,10 +25,60 @@ def export_to_csv(df: pd.DataFrame, output_path: str):
     output_file = Path(output_path)
     output_file.parent.mkdir(parents=True, exist_ok=True)
     
-    df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    # Buffer de 1 MiB: menos chamadas write() em exportações grandes
+    with open(output_path, 'wb', buffering=CSV_BUFFER_SIZE) as fh:
+        df.to_csv(fh, index=False, encoding='utf-8-sig')
     logger.info(f"CSV exportado: {output_path}")
 
 
+def _write_xlsx_streaming(df: pd.DataFrame, output_path: str, sheet_name: str):
+    """
+    Grava um DataFrame num XLSX novo com o openpyxl em modo write_only, que
+    escreve as linhas direto no XML sem criar um objeto de célula por valor.
+    O cabeçalho recebe o mesmo estilo usado por DataFrame.to_excel.
+    
+    Args:
+        df: DataFrame a exportar
+        output_path: Caminho do arquivo de saída
+        sheet_name: Nome da planilha
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    
+    borda = Side(style='thin')
+    cabecalho = []
+    for col in df.columns:
+        cell = WriteOnlyCell(ws, value=str(col))
+        cell.font = Font(bold=True)
+        cell.border = Border(left=borda, right=borda, top=borda, bottom=borda)
+        cell.alignment = Alignment(horizontal='center', vertical='top')
+        cabecalho.append(cell)
+    ws.append(cabecalho)
+    
+    # Colunas de data recebem o mesmo formato numérico do to_excel
+    colunas_data = [
+        i for i, dtype in enumerate(df.dtypes) if pd.api.types.is_datetime64_any_dtype(dtype)
+    ]
+    
+    # Valores ausentes (NaN/NaT) viram células vazias, como no to_excel
+    valores = df.astype(object).where(df.notna(), None)
+    for row in valores.itertuples(index=False, name=None):
+        if colunas_data:
+            row = list(row)
+            for i in colunas_data:
+                if row[i] is not None:
+                    cell = WriteOnlyCell(ws, value=row[i])
+                    cell.number_format = 'YYYY-MM-DD HH:MM:SS'
+                    row[i] = cell
+        ws.append(row)
+    
+    wb.save(output_path)
+
+
 def export_to_xlsx(df: pd.DataFrame, output_path: str, sheet_name: str = "Sheet1"):
     """
     Exporta DataFrame para XLSX.
@@ -44,8 +97,7 @@ def export_to_xlsx(df: pd.DataFrame, output_path: str, sheet_name: str = "Sheet1
             with pd.ExcelWriter(output_path, mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
                 df.to_excel(writer, sheet_name=sheet_name, index=False)
         else:
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
+            _write_xlsx_streaming(df, output_path, sheet_name)
         
         logger.info(f"XLSX exportado: {output_path} (planilha: {sheet_name})")
     
@@ -66,7 +118,8 @@ def export_all_summaries(
     debt_change: pd.DataFrame,
     data_quality: dict,
     output_dir: str,
-    formats: List[str]
+    formats: List[str],
+    metrics_by_bank: Optional[pd.DataFrame] = None
 ):
     """
     Exporta todos os resumos em CSV e/ou XLSX.
@@ -81,6 +134,8 @@ def export_all_summaries(
         data_quality: Dicionário com métricas de qualidade
         output_dir: Diretório de saída
         formats: Lista de formatos ('csv', 'xlsx')
+        metrics_by_bank: Métricas por banco já calculadas (calculate_open_metrics_by_bank);
+            se informadas, o resumo por banco é extraído delas sem novo groupby
     """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
@@ -100,7 +155,7 @@ def export_all_summaries(
         folder.mkdir(parents=True, exist_ok=True)
     
     # Resumo geral (apenas OPEN)
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
+    df_open = get_df_open(df)
     
     if 'csv' in formats:
         export_to_csv(df_open, str(folders['resumo_geral'] / 'open_summary_overall.csv'))
@@ -110,12 +165,17 @@ def export_all_summaries(
     
     # Resumo por banco
     if len(df_open) > 0:
-        by_bank = df_open.groupby('banco').agg({
-            'valor_float': ['sum', 'mean', 'count'],
-            'person_id': 'nunique'
-        }).reset_index()
-        by_bank.columns = ['banco', 'soma_divida', 'valor_medio', 'qtd_boletos', 'qtd_devedores']
-        by_bank = by_bank.sort_values('soma_divida', ascending=False)
+        if metrics_by_bank is not None and len(metrics_by_bank) > 0:
+            by_bank = metrics_by_bank[
+                ['banco', 'soma_divida', 'valor_medio', 'qtd_boletos', 'qtd_devedores_unicos']
+            ].rename(columns={'qtd_devedores_unicos': 'qtd_devedores'})
+        else:
+            by_bank = df_open.groupby('banco', observed=True).agg({
+                'valor_float': ['sum', 'mean', 'count'],
+                'person_id': 'nunique'
+            }).reset_index()
+            by_bank.columns = ['banco', 'soma_divida', 'valor_medio', 'qtd_boletos', 'qtd_devedores']
+            by_bank = by_bank.sort_values('soma_divida', ascending=False)
         
         if 'csv' in formats:
             export_to_csv(by_bank, str(folders['por_banco'] / 'open_summary_by_bank.csv'))
@@ -131,7 +191,7 @@ def export_all_summaries(
     
     # Resumo por banco e mês
     if len(df_open) > 0:
-        by_bank_month = df_open.groupby(['banco', 'mes_referencia']).agg({
+        by_bank_month = df_open.groupby(['banco', 'mes_referencia'], observed=True).agg({
             'valor_float': ['sum', 'mean', 'count'],
             'person_id': 'nunique'
         }).reset_index()
@@ -165,12 +225,15 @@ def export_all_summaries(
     
     # Mudanças mês a mês
     if len(debt_change) > 0:
+        colunas_top = [
+            debt_change.columns.get_loc(coluna)
+            for coluna in ['person_id', 'pena_agua', 'nome', 'mes_anterior', 'mes_atual',
+                           'divida_mes_anterior', 'divida_mes_atual', 'delta', 'pct_delta']
+        ]
         # Top 10 pioras
-        top_pioras = debt_change.nlargest(10, 'delta')[['person_id', 'pena_agua', 'nome', 'mes_anterior', 'mes_atual', 
-                                                         'divida_mes_anterior', 'divida_mes_atual', 'delta', 'pct_delta']]
+        top_pioras = debt_change.iloc[get_top_n_positions(debt_change['delta'], 10), colunas_top]
         # Top 10 melhoras
-        top_melhoras = debt_change.nsmallest(10, 'delta')[['person_id', 'pena_agua', 'nome', 'mes_anterior', 'mes_atual',
-                                                            'divida_mes_anterior', 'divida_mes_atual', 'delta', 'pct_delta']]
+        top_melhoras = debt_change.iloc[get_top_n_positions(debt_change['delta'], 10, largest=False), colunas_top]
         
         if 'csv' in formats:
             export_to_csv(debt_change, str(folders['mudancas'] / 'debt_change_month_over_month.csv'))
@@ -4,6 +4,7 @@ Leitura de arquivos CSV e preparação de dados.
 
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 import pandas as pd
@@ -88,6 +89,27 @@ def find_csv_files(input_path: str) -> List[str]:
     return []
 
 
+def _read_csv_with_origin(csv_file: str, encoding: str) -> Optional[pd.DataFrame]:
+    """
+    Lê um CSV e adiciona a coluna com o nome do arquivo de origem.
+    
+    Args:
+        csv_file: Caminho do arquivo CSV
+        encoding: Encoding do arquivo
+        
+    Returns:
+        DataFrame lido, ou None se a leitura falhar
+    """
+    try:
+        df = read_csv_file(csv_file, encoding=encoding)
+        # Adicionar coluna com origem do arquivo
+        df['arquivo_origem'] = os.path.basename(csv_file)
+        return df
+    except Exception as e:
+        logger.error(f"Erro ao processar {csv_file}: {e}")
+        return None
+
+
 def load_all_csvs(input_path: str, encoding: str = "utf-8-sig") -> pd.DataFrame:
     """
     Carrega todos os CSVs de um diretório ou arquivo único e concatena.
@@ -104,17 +126,16 @@ def load_all_csvs(input_path: str, encoding: str = "utf-8-sig") -> pd.DataFrame:
     if not csv_files:
         raise ValueError(f"Nenhum arquivo CSV encontrado em: {input_path}")
     
-    dataframes = []
+    # Arquivos independentes: lidos em threads (o parser em C do pandas libera
+    # o GIL durante a leitura), mantendo a ordem original na concatenação
+    max_workers = min(len(csv_files), os.cpu_count() or 1)
+    if max_workers <= 1:
+        resultados = [_read_csv_with_origin(f, encoding) for f in csv_files]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            resultados = list(executor.map(lambda f: _read_csv_with_origin(f, encoding), csv_files))
     
-    for csv_file in csv_files:
-        try:
-            df = read_csv_file(csv_file, encoding=encoding)
-            # Adicionar coluna com origem do arquivo
-            df['arquivo_origem'] = os.path.basename(csv_file)
-            dataframes.append(df)
-        except Exception as e:
-            logger.error(f"Erro ao processar {csv_file}: {e}")
-            continue
+    dataframes = [df for df in resultados if df is not None]
     
     if not dataframes:
         raise ValueError("Nenhum arquivo CSV foi carregado com sucesso")
@@ -3,13 +3,67 @@ Cálculo de métricas de inadimplência: KPIs, rankings, estatísticas.
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import pandas as pd
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+def get_df_open(df: pd.DataFrame, colunas: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Filtra apenas os boletos em aberto (OPEN).
+    
+    A indexação booleana já devolve um DataFrame novo, então não é feita
+    uma segunda cópia; quem precisar alterar colunas deve usar assign.
+    Informando `colunas`, só essas colunas são materializadas no filtro.
+    
+    Args:
+        df: DataFrame com dados limpos e classificados
+        colunas: Colunas a manter (default: todas)
+        
+    Returns:
+        DataFrame apenas com as linhas OPEN
+    """
+    mask_open = df['status_categoria'] == 'OPEN'
+    if colunas is None:
+        return df[mask_open]
+    return df.loc[mask_open, colunas]
+
+
+def get_top_n_positions(valores: pd.Series, n: int, largest: bool = True) -> np.ndarray:
+    """
+    Posições dos n maiores (ou menores) valores, na mesma ordem de
+    nlargest/nsmallest com keep='first': valor decrescente (ou crescente)
+    e, em caso de empate, a posição original. Valores ausentes são ignorados.
+    
+    Usa np.argpartition para achar o n-ésimo valor em O(N) e só ordena os
+    candidatos que o alcançam.
+    
+    Args:
+        valores: Série numérica
+        n: Quantidade de posições
+        largest: True para os maiores valores, False para os menores
+        
+    Returns:
+        Array de posições (para usar com iloc)
+    """
+    arr = valores.to_numpy(dtype=np.float64)
+    posicoes = np.flatnonzero(~np.isnan(arr))
+    chave = -arr[posicoes] if largest else arr[posicoes]
+    
+    if n <= 0:
+        return posicoes[:0]
+    if n < len(chave):
+        limite = chave[np.argpartition(chave, n - 1)[n - 1]]
+        candidatos = chave <= limite
+        posicoes = posicoes[candidatos]
+        chave = chave[candidatos]
+    
+    ordem = np.argsort(chave, kind='stable')[:n]
+    return posicoes[ordem]
+
+
 def calculate_open_metrics(df: pd.DataFrame) -> Dict[str, Any]:
     """
     Calcula métricas gerais apenas para boletos em aberto (OPEN).
@@ -21,7 +75,7 @@ def calculate_open_metrics(df: pd.DataFrame) -> Dict[str, Any]:
         Dicionário com métricas
     """
     # Filtrar apenas OPEN
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
+    df_open = get_df_open(df)
     
     if len(df_open) == 0:
         logger.warning("Nenhum boleto em aberto encontrado")
@@ -48,23 +102,34 @@ def calculate_open_metrics(df: pd.DataFrame) -> Dict[str, Any]:
     
     # Valores válidos
     valores = df_open[df_open['valor_valido']]['valor_float']
+    arr = valores.dropna().to_numpy(dtype=np.float64)
+    n = len(arr)
     
     # Métricas básicas
     total_devedores_unicos = df_open['person_id'].nunique()
     total_boletos_em_aberto = len(df_open)
-    soma_divida_em_aberto = valores.sum()
+    soma_divida_em_aberto = arr.sum()
     ticket_medio_em_aberto = soma_divida_em_aberto / total_devedores_unicos if total_devedores_unicos > 0 else 0.0
     
-    # Estatísticas descritivas
-    valor_medio = valores.mean() if len(valores) > 0 else 0.0
-    valor_mediana = valores.median() if len(valores) > 0 else 0.0
-    valor_moda = valores.mode().iloc[0] if len(valores.mode()) > 0 else 0.0
-    valor_desvio_padrao = valores.std() if len(valores) > 0 else 0.0
-    valor_p90 = valores.quantile(0.90) if len(valores) > 0 else 0.0
-    valor_p95 = valores.quantile(0.95) if len(valores) > 0 else 0.0
+    # Estatísticas descritivas: soma reaproveitada para média e desvio,
+    # e uma única ordenação para mediana, percentis e moda
+    if n > 0:
+        valor_medio = soma_divida_em_aberto / n
+        valor_desvio_padrao = np.sqrt(((arr - valor_medio) ** 2).sum() / (n - 1)) if n > 1 else np.nan
+        
+        ordenados = np.sort(arr)
+        valor_mediana, valor_p90, valor_p95 = np.quantile(ordenados, [0.50, 0.90, 0.95])
+        
+        # Moda: maior sequência de valores iguais (empate fica com o menor valor)
+        inicios = np.flatnonzero(np.r_[True, ordenados[1:] != ordenados[:-1]])
+        contagens = np.diff(np.r_[inicios, n])
+        valor_moda = ordenados[inicios[contagens.argmax()]]
+    else:
+        valor_medio = valor_mediana = valor_moda = valor_desvio_padrao = 0.0
+        valor_p90 = valor_p95 = 0.0
     
     # Maior e menor dívida individual (por pessoa)
-    dividas_por_pessoa = df_open.groupby('person_id')['valor_float'].sum().sort_values(ascending=False)
+    dividas_por_pessoa = df_open.groupby('person_id', observed=True)['valor_float'].sum().sort_values(ascending=False)
     
     if len(dividas_por_pessoa) > 0:
         maior_person_id = dividas_por_pessoa.index[0]
@@ -114,13 +179,13 @@ def calculate_open_metrics_by_bank(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com métricas por banco
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
+    df_open = get_df_open(df, ['banco', 'valor_float', 'valor_valido', 'person_id'])
     
     if len(df_open) == 0:
         return pd.DataFrame()
     
     # Agrupar por banco
-    metrics_by_bank = df_open.groupby('banco').agg({
+    metrics_by_bank = df_open.groupby('banco', observed=True).agg({
         'valor_float': ['sum', 'mean', 'median', 'std', 'count'],
         'person_id': 'nunique'
     }).reset_index()
@@ -145,26 +210,18 @@ def calculate_open_metrics_by_bank(df: pd.DataFrame) -> pd.DataFrame:
     metrics_by_bank['valor_mediana'] = metrics_by_bank['valor_mediana'].fillna(0.0)
     metrics_by_bank['valor_desvio_padrao'] = metrics_by_bank['valor_desvio_padrao'].fillna(0.0)
     
-    # Calcular percentis por banco
-    percentis_by_bank = []
-    for banco in metrics_by_bank['banco'].unique():
-        banco_data = df_open[df_open['banco'] == banco]
-        valores = banco_data[banco_data['valor_valido']]['valor_float']
-        if len(valores) > 0:
-            percentis_by_bank.append({
-                'banco': banco,
-                'valor_p90': valores.quantile(0.90),
-                'valor_p95': valores.quantile(0.95)
-            })
-        else:
-            percentis_by_bank.append({
-                'banco': banco,
-                'valor_p90': 0.0,
-                'valor_p95': 0.0
-            })
-    
-    percentis_df = pd.DataFrame(percentis_by_bank)
-    metrics_by_bank = metrics_by_bank.merge(percentis_df, on='banco', how='left')
+    # Calcular percentis por banco (um único groupby; bancos sem valores
+    # válidos ficam sem linha e recebem 0.0 abaixo)
+    validos = df_open[df_open['valor_valido']]
+    percentis_df = (
+        validos.groupby('banco', observed=True)['valor_float']
+        .quantile([0.90, 0.95])
+        .unstack()
+        .reindex(columns=[0.90, 0.95])
+    )
+    percentis_df.columns = ['valor_p90', 'valor_p95']
+    percentis_df.index = percentis_df.index.astype(object)
+    metrics_by_bank = metrics_by_bank.merge(percentis_df.reset_index(), on='banco', how='left')
     
     # Preencher NaN nos percentis
     metrics_by_bank['valor_p90'] = metrics_by_bank['valor_p90'].fillna(0.0)
@@ -186,8 +243,8 @@ def get_max_min_boleto_open(df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Dicionário com informações do maior e menor boleto
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
-    df_open_valid = df_open[df_open['valor_valido']].copy()
+    df_open = get_df_open(df)
+    df_open_valid = df_open[df_open['valor_valido']]
     
     if len(df_open_valid) == 0:
         return {
@@ -231,13 +288,13 @@ def calculate_temporal_evolution(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com métricas por mês
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
+    df_open = get_df_open(df, ['mes_referencia', 'valor_float', 'person_id'])
     
     if len(df_open) == 0:
         return pd.DataFrame()
     
     # Agrupar por mes_referencia
-    temporal = df_open.groupby('mes_referencia').agg({
+    temporal = df_open.groupby('mes_referencia', observed=True).agg({
         'valor_float': ['sum', 'mean', 'count'],
         'person_id': 'nunique'
     }).reset_index()
@@ -265,59 +322,70 @@ def calculate_debt_change_month_over_month(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com delta de dívida por pessoa entre meses consecutivos
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
+    df_open = get_df_open(df, ['person_id', 'mes_referencia', 'valor_float', 'pena_agua', 'nome_pagador'])
     
     if len(df_open) == 0:
         return pd.DataFrame()
     
     # Dívida por pessoa por mês
-    divida_por_mes = df_open.groupby(['person_id', 'mes_referencia'])['valor_float'].sum().reset_index()
+    divida_por_mes = df_open.groupby(['person_id', 'mes_referencia'], observed=True)['valor_float'].sum().reset_index()
     divida_por_mes.columns = ['person_id', 'mes_referencia', 'divida_mes']
     
     # Ordenar por pessoa e mês
     divida_por_mes = divida_por_mes.sort_values(['person_id', 'mes_referencia'])
     
-    # Calcular delta mês a mês
-    changes = []
+    # Mês anterior de cada linha: como os dados estão ordenados por pessoa e
+    # mês, basta deslocar uma linha e manter os pares da mesma pessoa
+    person_ids = divida_por_mes['person_id'].to_numpy()
+    meses = divida_por_mes['mes_referencia'].to_numpy()
+    dividas = divida_por_mes['divida_mes'].to_numpy()
     
-    for person_id in divida_por_mes['person_id'].unique():
-        person_data = divida_por_mes[divida_por_mes['person_id'] == person_id].sort_values('mes_referencia')
-        
-        if len(person_data) < 2:
-            continue
-        
-        for i in range(1, len(person_data)):
-            mes_anterior = person_data.iloc[i-1]
-            mes_atual = person_data.iloc[i]
-            
-            divida_anterior = mes_anterior['divida_mes']
-            divida_atual = mes_atual['divida_mes']
-            delta = divida_atual - divida_anterior
-            pct_delta = (delta / divida_anterior * 100) if divida_anterior > 0 else 0.0
-            
-            # Buscar informações da pessoa
-            person_row = df_open[df_open['person_id'] == person_id].iloc[0]
-            
-            changes.append({
-                'person_id': person_id,
-                'pena_agua': person_row['pena_agua'],
-                'nome': person_row['nome_pagador'],
-                'mes_anterior': mes_anterior['mes_referencia'],
-                'mes_atual': mes_atual['mes_referencia'],
-                'divida_mes_anterior': divida_anterior,
-                'divida_mes_atual': divida_atual,
-                'delta': delta,
-                'pct_delta': pct_delta,
-            })
-    
-    if not changes:
+    mesma_pessoa = person_ids[1:] == person_ids[:-1]
+    if not mesma_pessoa.any():
         return pd.DataFrame()
     
-    changes_df = pd.DataFrame(changes)
+    divida_anterior = dividas[:-1][mesma_pessoa]
+    divida_atual = dividas[1:][mesma_pessoa]
+    delta = divida_atual - divida_anterior
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_delta = np.where(divida_anterior > 0, delta / divida_anterior * 100, 0.0)
+    
+    # Informações da pessoa: primeira linha de cada person_id
+    pessoas = df_open.drop_duplicates('person_id').set_index('person_id')
+    ids_atual = person_ids[1:][mesma_pessoa]
+    pessoas = pessoas.reindex(ids_atual)
+    
+    changes_df = pd.DataFrame({
+        'person_id': ids_atual,
+        'pena_agua': pessoas['pena_agua'].to_numpy(),
+        'nome': pessoas['nome_pagador'].to_numpy(),
+        'mes_anterior': meses[:-1][mesma_pessoa],
+        'mes_atual': meses[1:][mesma_pessoa],
+        'divida_mes_anterior': divida_anterior,
+        'divida_mes_atual': divida_atual,
+        'delta': delta,
+        'pct_delta': pct_delta,
+    })
     
     return changes_df
 
 
+def get_most_common_status_by_person(df_open: pd.DataFrame) -> pd.Series:
+    """
+    Status mais frequente (moda de status_norm) de cada pessoa. Em caso de
+    empate vale o menor status em ordem alfabética, como em Series.mode().
+    
+    Args:
+        df_open: DataFrame com boletos em aberto
+        
+    Returns:
+        Série indexada por person_id com o status mais comum
+    """
+    contagem = df_open.groupby(['person_id', 'status_norm'], observed=True).size().reset_index(name='qtd')
+    contagem = contagem.sort_values(['person_id', 'qtd', 'status_norm'], ascending=[True, False, True])
+    return contagem.drop_duplicates('person_id').set_index('person_id')['status_norm']
+
+
 def get_top_debtors_by_total_debt(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
     """
     Ranking de devedores por dívida total.
@@ -329,20 +397,20 @@ def get_top_debtors_by_total_debt(df: pd.DataFrame, top_n: int = 10) -> pd.DataF
     Returns:
         DataFrame com ranking
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
+    df_open = get_df_open(df)
     
     if len(df_open) == 0:
         return pd.DataFrame()
     
-    ranking = df_open.groupby('person_id').agg({
+    ranking = df_open.groupby('person_id', observed=True).agg({
         'valor_float': 'sum',
         'pena_agua': 'first',
         'nome_pagador': 'first',
-        'status_norm': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else None,
     }).reset_index()
     
-    ranking.columns = ['person_id', 'divida_total', 'pena_agua', 'nome', 'status_mais_comum']
-    ranking = ranking.sort_values('divida_total', ascending=False).head(top_n)
+    ranking.columns = ['person_id', 'divida_total', 'pena_agua', 'nome']
+    ranking['status_mais_comum'] = ranking['person_id'].map(get_most_common_status_by_person(df_open))
+    ranking = ranking.iloc[get_top_n_positions(ranking['divida_total'], top_n)]
     ranking['rank'] = range(1, len(ranking) + 1)
     
     return ranking[['rank', 'person_id', 'pena_agua', 'nome', 'divida_total', 'status_mais_comum']]
@@ -364,20 +432,25 @@ def calculate_data_quality(df: pd.DataFrame) -> Dict[str, Any]:
     qtd_linhas_invalidas_valor = (~df['valor_valido']).sum()
     qtd_linhas_invalidas_data = (~df['data_valida']).sum()
     
-    # Duplicidades suspeitas
+    # Duplicidades suspeitas: uma única passada de hash por chave
+    # (linhas com chave ausente ficam de fora, como no groupby)
+    def _duplicidades(chaves, colunas_exemplo):
+        mask_dup = df.duplicated(subset=chaves, keep=False) & df[chaves].notna().all(axis=1)
+        qtd_grupos = len(df.loc[mask_dup, chaves].drop_duplicates())
+        exemplos = df.loc[mask_dup, colunas_exemplo].head(10).to_dict('records')
+        return qtd_grupos, exemplos
+    
     # Duplicado por (banco, numero_nosso)
-    dup_nosso = df.groupby(['banco', 'numero_nosso']).size()
-    dup_nosso_count = (dup_nosso > 1).sum()
-    dup_nosso_examples = df[df.set_index(['banco', 'numero_nosso']).index.isin(
-        dup_nosso[dup_nosso > 1].index
-    )].head(10)[['banco', 'numero_nosso', 'nome_pagador', 'valor_float', 'data_vencimento_dt']].to_dict('records')
+    dup_nosso_count, dup_nosso_examples = _duplicidades(
+        ['banco', 'numero_nosso'],
+        ['banco', 'numero_nosso', 'nome_pagador', 'valor_float', 'data_vencimento_dt']
+    )
     
     # Duplicado por (banco, numero_seu, data_vencimento, valor)
-    dup_seu = df.groupby(['banco', 'numero_seu', 'data_vencimento_dt', 'valor_float']).size()
-    dup_seu_count = (dup_seu > 1).sum()
-    dup_seu_examples = df[df.set_index(['banco', 'numero_seu', 'data_vencimento_dt', 'valor_float']).index.isin(
-        dup_seu[dup_seu > 1].index
-    )].head(10)[['banco', 'numero_seu', 'nome_pagador', 'valor_float', 'data_vencimento_dt']].to_dict('records')
+    dup_seu_count, dup_seu_examples = _duplicidades(
+        ['banco', 'numero_seu', 'data_vencimento_dt', 'valor_float'],
+        ['banco', 'numero_seu', 'nome_pagador', 'valor_float', 'data_vencimento_dt']
+    )
     
     return {
         'total_linhas': int(total_linhas),
@@ -3,9 +3,11 @@ Análise de reincidência: devedores recorrentes, padrões mês a mês.
 """
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import pandas as pd
 
+from boletos_report.metrics import get_df_open, get_most_common_status_by_person
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,18 +21,17 @@ def calculate_recurrence(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com detalhes de reincidência por pessoa
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
+    df_open = get_df_open(df)
     
     if len(df_open) == 0:
         return pd.DataFrame()
     
     # Agrupar por person_id
-    recurrence = df_open.groupby('person_id').agg({
+    recurrence = df_open.groupby('person_id', observed=True).agg({
         'mes_referencia': ['nunique', lambda x: sorted(x.unique().tolist())],
         'valor_float': ['sum', 'mean', 'count'],
         'pena_agua': 'first',
         'nome_pagador': 'first',
-        'status_norm': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else None,
     }).reset_index()
     
     recurrence.columns = [
@@ -41,9 +42,9 @@ def calculate_recurrence(df: pd.DataFrame) -> pd.DataFrame:
         'media_open',
         'qtd_boletos_open',
         'pena_agua',
-        'nome',
-        'status_mais_comum'
+        'nome'
     ]
+    recurrence['status_mais_comum'] = recurrence['person_id'].map(get_most_common_status_by_person(df_open))
     
     # Converter meses_lista para string para facilitar exportação
     recurrence['meses_lista'] = recurrence['meses_lista'].apply(lambda x: ', '.join(map(str, x)))
@@ -51,18 +52,25 @@ def calculate_recurrence(df: pd.DataFrame) -> pd.DataFrame:
     return recurrence.sort_values('qtd_boletos_open', ascending=False)
 
 
-def get_top_recurrent_debtors(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
+def get_top_recurrent_debtors(
+    df: pd.DataFrame,
+    top_n: int = 10,
+    recurrence: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
     """
     Ranking de devedores por reincidência (quantidade de boletos em aberto).
     
     Args:
         df: DataFrame com dados limpos
         top_n: Número de top reincidentes
+        recurrence: Resultado de calculate_recurrence(df) já calculado;
+            se não informado, é recalculado
         
     Returns:
         DataFrame com ranking
     """
-    recurrence = calculate_recurrence(df)
+    if recurrence is None:
+        recurrence = calculate_recurrence(df)
     
     if len(recurrence) == 0:
         return pd.DataFrame()
@@ -83,30 +91,30 @@ def calculate_recurrence_by_month(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com contagem de reincidentes por mês
     """
-    df_open = df[df['status_categoria'] == 'OPEN'].copy()
+    df_open = get_df_open(df)
     
     if len(df_open) == 0:
         return pd.DataFrame()
     
-    # Para cada mês, contar quantos devedores já apareceram em meses anteriores
-    meses_ordenados = sorted(df_open['mes_referencia'].unique())
-    
-    recurrence_by_month = []
-    devedores_anteriores = set()
-    
-    for mes in meses_ordenados:
-        devedores_mes_atual = set(df_open[df_open['mes_referencia'] == mes]['person_id'].unique())
-        devedores_novos = devedores_mes_atual - devedores_anteriores
-        devedores_reincidentes = devedores_mes_atual & devedores_anteriores
-        
-        recurrence_by_month.append({
-            'mes_referencia': mes,
-            'qtd_devedores_total': len(devedores_mes_atual),
-            'qtd_devedores_novos': len(devedores_novos),
-            'qtd_devedores_reincidentes': len(devedores_reincidentes),
-            'pct_reincidentes': (len(devedores_reincidentes) / len(devedores_mes_atual) * 100) if len(devedores_mes_atual) > 0 else 0.0,
-        })
-        
-        devedores_anteriores.update(devedores_mes_atual)
-    
-    return pd.DataFrame(recurrence_by_month)
+    # Um devedor é reincidente num mês se já apareceu em algum mês anterior,
+    # ou seja, se aquele não é o primeiro mês em que aparece
+    pares = df_open[['person_id', 'mes_referencia']].drop_duplicates()
+    meses = pares['mes_referencia'].astype(str)
+    primeiro_mes = meses.groupby(pares['person_id'], observed=True).transform('min')
+    
+    recurrence_by_month = pd.DataFrame({
+        'mes_referencia': meses,
+        'novo': meses == primeiro_mes,
+    }).groupby('mes_referencia', sort=True).agg(
+        qtd_devedores_total=('novo', 'size'),
+        qtd_devedores_novos=('novo', 'sum'),
+    ).reset_index()
+    
+    recurrence_by_month['qtd_devedores_reincidentes'] = (
+        recurrence_by_month['qtd_devedores_total'] - recurrence_by_month['qtd_devedores_novos']
+    )
+    recurrence_by_month['pct_reincidentes'] = (
+        recurrence_by_month['qtd_devedores_reincidentes'] / recurrence_by_month['qtd_devedores_total'] * 100
+    )
+    
+    return recurrence_by_month
@@ -2,68 +2,25 @@
 Geração de relatório HTML com resumo executivo.
 """
 
+import json
 import logging
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from string import Formatter, Template
 from typing import Dict, Any
+import numpy as np
 import pandas as pd
 
-logger = logging.getLogger(__name__)
-
-
-def format_currency(value: float) -> str:
-    """Formata valor como moeda brasileira."""
-    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-
-def format_number(value: float) -> str:
-    """Formata número com separador de milhar."""
-    return f"{value:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
+from boletos_report.metrics import get_df_open, get_top_n_positions
 
-def format_percent(value: float) -> str:
-    """Formata percentual."""
-    return f"{value:.2f}%"
+logger = logging.getLogger(__name__)
 
+HTML_BUFFER_SIZE = 1 << 20
 
-def generate_html_report(
-    metrics: Dict[str, Any],
-    metrics_by_bank: pd.DataFrame,
-    max_min_boleto: Dict[str, Any],
-    temporal_df: pd.DataFrame,
-    ranking_total: pd.DataFrame,
-    ranking_recurrence: pd.DataFrame,
-    debt_change: pd.DataFrame,
-    data_quality: Dict[str, Any],
-    status_classifier,
-    df_clean: pd.DataFrame,
-    output_dir: str,
-    report_number: int
-):
-    """
-    Gera relatório HTML completo.
-    
-    Args:
-        metrics: Dicionário com métricas gerais
-        metrics_by_bank: DataFrame com métricas por banco
-        max_min_boleto: Dicionário com maior e menor boleto
-        temporal_df: DataFrame com evolução temporal
-        ranking_total: Ranking por dívida total
-        ranking_recurrence: Ranking por reincidência
-        debt_change: Mudanças mês a mês
-        data_quality: Dicionário com métricas de qualidade
-        status_classifier: Instância de StatusClassifier
-        output_dir: Diretório de saída
-    """
-    logger.info("Gerando relatório HTML...")
-    
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    
-    html_content = []
-    
-    # Cabeçalho
-    html_content.append("""<!DOCTYPE html>
+# Trechos estáticos do documento, montados uma única vez na importação.
+# O cabeçalho (HTML + CSS) usa string.Template porque o CSS contém chaves.
+_HTML_CABECALHO = Template("""<!DOCTYPE html>
 <html lang="pt-BR">
 <head>
     <meta charset="UTF-8">
@@ -321,579 +278,72 @@ def generate_html_report(
     <body>
     <div class="container">
         <h1>📊 Relatório de Inadimplência</h1>
-        <p><strong>Número do Relatório:</strong> relatorio_""" + str(report_number) + """</p>
-        <p><strong>Data de geração:</strong> """ + datetime.now().strftime("%d/%m/%Y %H:%M:%S") + """</p>
+        <p><strong>Número do Relatório:</strong> relatorio_$report_number</p>
+        <p><strong>Data de geração:</strong> $data_geracao</p>
 """)
-    
-    # Gráfico de Evolução da Dívida Total
-    html_content.append("""
-        <div style="background-color: white; border: 2px solid #1976d2; border-radius: 8px; padding: 25px; margin: 30px 0;">
-            <h2 style="margin-top: 0; color: #1976d2; text-align: center;">📈 Evolução da Dívida Total ao Longo dos Meses</h2>
-            <div style="position: relative; height: 400px; margin: 20px 0;">
-                <canvas id="debtEvolutionChart"></canvas>
-            </div>
-            <div id="debtEvolutionValues" style="margin-top: 20px; text-align: center; font-size: 14px; color: #555;"></div>
-        </div>
-    """)
-    
-    # Painel Interativo de Baixa Manual
-    html_content.append("""
-        <div class="interactive-panel">
-            <h2 style="margin-top: 0; color: #1976d2;">🔧 Baixa Manual de Inadimplência</h2>
-            <p>Digite a pena de água para dar baixa manual (ex: pessoa já pagou mas ainda consta como em aberto).</p>
-            <div class="search-box">
-                <input type="text" id="penaInput" placeholder="Digite a pena de água (ex: 436)" />
-                <button onclick="removerPena()">Dar Baixa</button>
-                <button onclick="resetarBaixas()" style="background-color: #757575;">Resetar Todas</button>
-                <button onclick="salvarMudancas()" style="background-color: #4caf50; margin-left: 10px;" id="btnSalvar" title="Salvar mudanças no arquivo HTML (para portabilidade)">
-                    💾 Salvar Mudanças
-                </button>
-            </div>
-            <div id="removedPenas" style="margin-top: 10px;"></div>
-            <div id="saveStatus" style="margin-top: 10px; font-size: 14px; color: #4caf50; display: none;"></div>
-        </div>
-        <div id="toastNotification" style="position: fixed; top: 20px; right: 20px; background-color: #4caf50; color: white; padding: 20px 30px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.3); z-index: 10000; display: none; font-size: 16px; font-weight: bold; animation: slideIn 0.3s ease-out;">
-            ✓ Mudanças salvas com sucesso!
+
+_HTML_RODAPE = """
+        <div class="footer">
+            <p>Relatório gerado automaticamente pelo Sistema de Análise de Inadimplência</p>
+            <p>Foco: Identificação e acompanhamento de devedores e inadimplência</p>
         </div>
-    """)
-    
-    # 1. KPIs Gerais (apenas OPEN)
-    html_content.append("""
-        <h2>1. Panorama Geral de Inadimplência</h2>
-        <div class="kpi-grid">
-""")
-    
-    html_content.append(f"""
+    </div>
+</body>
+</html>
+"""
+
+# Cartões de KPI e tabela de estatísticas, preenchidos com format_map
+_HTML_KPIS = """
             <div class="kpi-card warning">
                 <div class="kpi-label">Total de Devedores Únicos</div>
-                <div class="kpi-value dynamic" id="kpi-devedores">{format_number(metrics['total_devedores_unicos'])}</div>
+                <div class="kpi-value dynamic" id="kpi-devedores">{total_devedores_unicos}</div>
             </div>
             <div class="kpi-card warning">
                 <div class="kpi-label">Total de Boletos em Aberto</div>
-                <div class="kpi-value dynamic" id="kpi-boletos">{format_number(metrics['total_boletos_em_aberto'])}</div>
+                <div class="kpi-value dynamic" id="kpi-boletos">{total_boletos_em_aberto}</div>
             </div>
             <div class="kpi-card danger">
                 <div class="kpi-label">Soma da Dívida em Aberto</div>
-                <div class="kpi-value dynamic" id="kpi-divida">{format_currency(metrics['soma_divida_em_aberto'])}</div>
+                <div class="kpi-value dynamic" id="kpi-divida">{soma_divida_em_aberto}</div>
             </div>
             <div class="kpi-card">
                 <div class="kpi-label">Ticket Médio em Aberto</div>
-                <div class="kpi-value dynamic" id="kpi-ticket">{format_currency(metrics['ticket_medio_em_aberto'])}</div>
+                <div class="kpi-value dynamic" id="kpi-ticket">{ticket_medio_em_aberto}</div>
             </div>
         </div>
-""")
-    
-    # Estatísticas descritivas
-    html_content.append("""
-        <h3>Estatísticas Descritivas (Valores em Aberto)</h3>
-        <table>
-            <tr>
-                <th>Métrica</th>
-                <th>Valor</th>
-            </tr>
-""")
-    
-    html_content.append(f"""
-            <tr><td>Média</td><td class="dynamic" id="stat-media">{format_currency(metrics['valor_medio'])}</td></tr>
-            <tr><td>Mediana</td><td class="dynamic" id="stat-mediana">{format_currency(metrics['valor_mediana'])}</td></tr>
-            <tr><td>Moda</td><td class="dynamic" id="stat-moda">{format_currency(metrics['valor_moda'])}</td></tr>
-            <tr><td>Desvio Padrão</td><td class="dynamic" id="stat-desvio">{format_currency(metrics['valor_desvio_padrao'])}</td></tr>
-            <tr><td>Percentil 90</td><td class="dynamic" id="stat-p90">{format_currency(metrics['valor_p90'])}</td></tr>
-            <tr><td>Percentil 95</td><td class="dynamic" id="stat-p95">{format_currency(metrics['valor_p95'])}</td></tr>
-        </table>
-""")
-    
-    # Maior e menor dívida individual
-    html_content.append("""
-        <h3>Maior e Menor Dívida Individual</h3>
-        <table id="maxMinDebtTable">
-            <tr>
-                <th>Métrica</th>
-                <th>Pena de Água</th>
-                <th>Nome</th>
-                <th>Valor</th>
-            </tr>
-""")
-    
-    if metrics['maior_divida_person_id']:
-        html_content.append(f"""
-            <tr id="maior-divida-row">
-                <td><strong>Maior Dívida</strong></td>
-                <td id="maior-divida-pena">{metrics['maior_divida_pena_agua']}</td>
-                <td id="maior-divida-nome">{metrics['maior_divida_nome']}</td>
-                <td id="maior-divida-valor">{format_currency(metrics['maior_divida_individual'])}</td>
-            </tr>
-""")
-    
-    if metrics['menor_divida_person_id']:
-        html_content.append(f"""
-            <tr id="menor-divida-row">
-                <td><strong>Menor Dívida</strong></td>
-                <td id="menor-divida-pena">{metrics['menor_divida_pena_agua']}</td>
-                <td id="menor-divida-nome">{metrics['menor_divida_nome']}</td>
-                <td id="menor-divida-valor">{format_currency(metrics['menor_divida_individual'])}</td>
-            </tr>
-""")
-    
-    html_content.append("</table>")
-    
-    # 2. Máximos e mínimos de boletos
-    html_content.append("""
-        <h2>2. Boletos com Maior e Menor Valor em Aberto</h2>
-""")
-    
-    if max_min_boleto.get('boleto_open_max'):
-        boleto_max = max_min_boleto['boleto_open_max']
-        html_content.append(f"""
-        <h3>Maior Boleto em Aberto</h3>
-        <table>
-            <tr><th>Campo</th><th>Valor</th></tr>
-            <tr><td>Valor</td><td class="dynamic" id="boleto-max-valor">{format_currency(boleto_max['valor'])}</td></tr>
-            <tr><td>Nome</td><td class="dynamic" id="boleto-max-nome">{boleto_max['nome']}</td></tr>
-            <tr><td>Pena de Água</td><td class="dynamic" id="boleto-max-pena">{boleto_max['pena_agua']}</td></tr>
-            <tr><td>Vencimento</td><td class="dynamic" id="boleto-max-vencimento">{boleto_max['vencimento'].strftime('%d/%m/%Y') if boleto_max['vencimento'] else 'N/A'}</td></tr>
-            <tr><td>Banco</td><td class="dynamic" id="boleto-max-banco">{boleto_max['banco']}</td></tr>
-            <tr><td>Número Nosso</td><td class="dynamic" id="boleto-max-numero">{boleto_max['numero_nosso']}</td></tr>
-        </table>
-""")
-    
-    if max_min_boleto.get('boleto_open_min'):
-        boleto_min = max_min_boleto['boleto_open_min']
-        html_content.append(f"""
-        <h3>Menor Boleto em Aberto</h3>
-        <table>
-            <tr><th>Campo</th><th>Valor</th></tr>
-            <tr><td>Valor</td><td class="dynamic" id="boleto-min-valor">{format_currency(boleto_min['valor'])}</td></tr>
-            <tr><td>Nome</td><td class="dynamic" id="boleto-min-nome">{boleto_min['nome']}</td></tr>
-            <tr><td>Pena de Água</td><td class="dynamic" id="boleto-min-pena">{boleto_min['pena_agua']}</td></tr>
-            <tr><td>Vencimento</td><td class="dynamic" id="boleto-min-vencimento">{boleto_min['vencimento'].strftime('%d/%m/%Y') if boleto_min['vencimento'] else 'N/A'}</td></tr>
-            <tr><td>Banco</td><td class="dynamic" id="boleto-min-banco">{boleto_min['banco']}</td></tr>
-            <tr><td>Número Nosso</td><td class="dynamic" id="boleto-min-numero">{boleto_min['numero_nosso']}</td></tr>
+"""
+
+_HTML_ESTATISTICAS = """
+            <tr><td>Média</td><td class="dynamic" id="stat-media">{valor_medio}</td></tr>
+            <tr><td>Mediana</td><td class="dynamic" id="stat-mediana">{valor_mediana}</td></tr>
+            <tr><td>Moda</td><td class="dynamic" id="stat-moda">{valor_moda}</td></tr>
+            <tr><td>Desvio Padrão</td><td class="dynamic" id="stat-desvio">{valor_desvio_padrao}</td></tr>
+            <tr><td>Percentil 90</td><td class="dynamic" id="stat-p90">{valor_p90}</td></tr>
+            <tr><td>Percentil 95</td><td class="dynamic" id="stat-p95">{valor_p95}</td></tr>
         </table>
-""")
-    
-    # 2.5. Análise por Banco
-    html_content.append("""
-        <h2>2.5. Análise de Inadimplência por Banco</h2>
-""")
-    
-    if len(metrics_by_bank) > 0:
-        html_content.append("""
-        <h3>Métricas por Banco</h3>
-        <table>
-            <tr>
-                <th>Banco</th>
-                <th>Soma da Dívida</th>
-                <th>Valor Médio</th>
-                <th>Valor Mediana</th>
-                <th>Desvio Padrão</th>
-                <th>P90</th>
-                <th>P95</th>
-                <th>Qtd Boletos</th>
-                <th>Qtd Devedores Únicos</th>
-                <th>Ticket Médio</th>
-            </tr>
-""")
-        for _, row in metrics_by_bank.iterrows():
-            html_content.append(f"""
-            <tr>
-                <td><strong>{row['banco']}</strong></td>
-                <td>{format_currency(row['soma_divida'])}</td>
-                <td>{format_currency(row['valor_medio'])}</td>
-                <td>{format_currency(row['valor_mediana'])}</td>
-                <td>{format_currency(row['valor_desvio_padrao'])}</td>
-                <td>{format_currency(row['valor_p90'])}</td>
-                <td>{format_currency(row['valor_p95'])}</td>
-                <td>{format_number(row['qtd_boletos'])}</td>
-                <td>{format_number(row['qtd_devedores_unicos'])}</td>
-                <td>{format_currency(row['ticket_medio'])}</td>
-            </tr>
-""")
-        html_content.append("</table>")
-        
-        # Gráfico de barras por banco (soma da dívida)
-        html_content.append("""
-        <h3>Comparação de Dívida Total por Banco</h3>
-        <p><em>Os valores estão ordenados do maior para o menor.</em></p>
-        <table>
-            <tr>
-                <th>Banco</th>
-                <th>Soma da Dívida</th>
-                <th>% do Total</th>
-            </tr>
-""")
-        total_geral = metrics_by_bank['soma_divida'].sum()
-        for _, row in metrics_by_bank.iterrows():
-            pct = (row['soma_divida'] / total_geral * 100) if total_geral > 0 else 0.0
-            html_content.append(f"""
-            <tr>
-                <td><strong>{row['banco']}</strong></td>
-                <td>{format_currency(row['soma_divida'])}</td>
-                <td>{format_percent(pct)}</td>
-            </tr>
-""")
-        html_content.append("</table>")
-    else:
-        html_content.append("<p>Nenhum dado disponível para análise por banco.</p>")
-    
-    # 3. Ranking de devedores
-    html_content.append("""
-        <h2>3. Ranking de Devedores</h2>
-""")
-    
-    if len(ranking_total) > 0:
-        html_content.append("""
-        <h3>Top 10 por Dívida Total</h3>
-        <table>
-            <tr>
-                <th>Rank</th>
-                <th>Pena de Água</th>
-                <th>Nome</th>
-                <th>Dívida Total</th>
-                <th>Status Mais Comum</th>
-            </tr>
-""")
-        for _, row in ranking_total.iterrows():
-            html_content.append(f"""
-            <tr>
-                <td>{int(row['rank'])}</td>
-                <td>{row['pena_agua']}</td>
-                <td>{row['nome'][:50]}{'...' if len(row['nome']) > 50 else ''}</td>
-                <td>{format_currency(row['divida_total'])}</td>
-                <td><span class="badge badge-danger">{row['status_mais_comum']}</span></td>
-            </tr>
-""")
-        html_content.append("</table>")
-    
-    if len(ranking_recurrence) > 0:
-        html_content.append("""
-        <h3>Top 10 por Reincidência (Quantidade de Boletos)</h3>
-        <table>
-            <tr>
-                <th>Rank</th>
-                <th>Pena de Água</th>
-                <th>Nome</th>
-                <th>Qtd Boletos</th>
-                <th>Meses Apareceu</th>
-                <th>Dívida Total</th>
-            </tr>
-""")
-        for _, row in ranking_recurrence.iterrows():
-            html_content.append(f"""
-            <tr>
-                <td>{int(row['rank'])}</td>
-                <td>{row['pena_agua']}</td>
-                <td>{row['nome'][:50]}{'...' if len(row['nome']) > 50 else ''}</td>
-                <td>{int(row['qtd_boletos_open'])}</td>
-                <td>{int(row['meses_apareceu'])}</td>
-                <td>{format_currency(row['soma_open'])}</td>
-            </tr>
-""")
-        html_content.append("</table>")
-    
-    # 4. Evolução temporal
-    html_content.append("""
-        <h2>4. Evolução Temporal da Inadimplência</h2>
-""")
-    
-    if len(temporal_df) > 0:
-        html_content.append("""
-        <table>
-            <tr>
-                <th>Mês</th>
-                <th>Soma Dívida em Aberto</th>
-                <th>Qtd Boletos em Aberto</th>
-                <th>Qtd Devedores Únicos</th>
-                <th>Valor Médio em Aberto</th>
-            </tr>
-""")
-        for _, row in temporal_df.iterrows():
-            html_content.append(f"""
-            <tr>
-                <td>{row['mes_referencia']}</td>
-                <td>{format_currency(row['soma_divida_open'])}</td>
-                <td>{format_number(row['qtd_boletos_open'])}</td>
-                <td>{format_number(row['qtd_devedores_open_unicos'])}</td>
-                <td>{format_currency(row['valor_medio_open'])}</td>
-            </tr>
-""")
-        html_content.append("</table>")
-    
-    # 5. Pioras e melhoras
-    html_content.append("""
-        <h2>5. Pioras e Melhoras (Mudanças Mês a Mês)</h2>
-""")
-    
-    if len(debt_change) > 0:
-        top_pioras = debt_change.nlargest(10, 'delta')
-        top_melhoras = debt_change.nsmallest(10, 'delta')
-        
-        html_content.append("""
-        <h3>Top 10 Maiores Aumentos de Dívida</h3>
-        <table>
-            <tr>
-                <th>Pena de Água</th>
-                <th>Nome</th>
-                <th>Mês Anterior</th>
-                <th>Mês Atual</th>
-                <th>Dívida Anterior</th>
-                <th>Dívida Atual</th>
-                <th>Delta</th>
-                <th>% Delta</th>
-            </tr>
-""")
-        for _, row in top_pioras.iterrows():
-            html_content.append(f"""
-            <tr>
-                <td>{row['pena_agua']}</td>
-                <td>{row['nome'][:40]}{'...' if len(row['nome']) > 40 else ''}</td>
-                <td>{row['mes_anterior']}</td>
-                <td>{row['mes_atual']}</td>
-                <td>{format_currency(row['divida_mes_anterior'])}</td>
-                <td>{format_currency(row['divida_mes_atual'])}</td>
-                <td><span class="badge badge-danger">+{format_currency(row['delta'])}</span></td>
-                <td>+{format_percent(row['pct_delta'])}</td>
-            </tr>
-""")
-        html_content.append("</table>")
-        
-        html_content.append("""
-        <h3>Top 10 Maiores Reduções de Dívida</h3>
-        <table>
-            <tr>
-                <th>Pena de Água</th>
-                <th>Nome</th>
-                <th>Mês Anterior</th>
-                <th>Mês Atual</th>
-                <th>Dívida Anterior</th>
-                <th>Dívida Atual</th>
-                <th>Delta</th>
-                <th>% Delta</th>
-            </tr>
-""")
-        for _, row in top_melhoras.iterrows():
-            html_content.append(f"""
-            <tr>
-                <td>{row['pena_agua']}</td>
-                <td>{row['nome'][:40]}{'...' if len(row['nome']) > 40 else ''}</td>
-                <td>{row['mes_anterior']}</td>
-                <td>{row['mes_atual']}</td>
-                <td>{format_currency(row['divida_mes_anterior'])}</td>
-                <td>{format_currency(row['divida_mes_atual'])}</td>
-                <td><span class="badge badge-success">{format_currency(row['delta'])}</span></td>
-                <td>{format_percent(row['pct_delta'])}</td>
-            </tr>
-""")
-        html_content.append("</table>")
-    
-    # 6. Qualidade de dados
-    html_content.append("""
-        <h2>6. Qualidade dos Dados</h2>
-        <table>
-            <tr>
-                <th>Métrica</th>
-                <th>Valor</th>
-            </tr>
-""")
-    
-    html_content.append(f"""
-            <tr><td>Total de Linhas</td><td>{format_number(data_quality['total_linhas'])}</td></tr>
-            <tr><td>Linhas com Valor Inválido</td><td>{format_number(data_quality['qtd_linhas_invalidas_valor'])} ({format_percent(data_quality['pct_linhas_invalidas_valor'])})</td></tr>
-            <tr><td>Linhas com Data Inválida</td><td>{format_number(data_quality['qtd_linhas_invalidas_data'])} ({format_percent(data_quality['pct_linhas_invalidas_data'])})</td></tr>
-            <tr><td>Duplicidades (Banco + Número Nosso)</td><td>{format_number(data_quality['duplicidades_banco_numero_nosso'])}</td></tr>
-            <tr><td>Duplicidades (Banco + Número Seu)</td><td>{format_number(data_quality['duplicidades_banco_numero_seu'])}</td></tr>
-        </table>
-""")
-    
-    # Status desconhecidos
-    unknown_statuses = status_classifier.get_unknown_statuses()
-    if unknown_statuses:
-        html_content.append("""
-        <h3>Status Desconhecidos (Não Classificados)</h3>
-        <p>Os seguintes status foram encontrados mas não foram classificados como PAGO ou EM ABERTO:</p>
-        <ul>
-""")
-        for status in sorted(unknown_statuses):
-            html_content.append(f"<li><code>{status}</code></li>")
-        html_content.append("</ul>")
-        html_content.append("<p><strong>Recomendação:</strong> Revise as regras de classificação usando --paid-status e --open-status.</p>")
-    
-    # 7. Lista Completa de Devedores em Aberto
-    html_content.append("""
-        <h2>7. Lista Completa de Devedores em Aberto</h2>
-        <p><em>Lista completa ordenada por valor em aberto (maior para menor). Use para verificação se realmente estão em aberto.</em></p>
-        <table id="debtorsTable">
-            <thead>
-            <tr>
-                <th style="width: 50px;">Ação</th>
-                <th class="sortable" data-sort="pena" data-type="number">Pena de Água</th>
-                <th class="sortable" data-sort="nome" data-type="text">Nome</th>
-                <th class="sortable" data-sort="banco" data-type="text">Banco</th>
-                <th class="sortable sort-desc" data-sort="valor" data-type="number">Valor em Aberto</th>
-                <th class="sortable" data-sort="qtd" data-type="number">Qtd Boletos</th>
-                <th class="sortable" data-sort="mes" data-type="text">Meses</th>
-            </tr>
-            </thead>
-            <tbody>
-""")
-    
-    # Obter todos os devedores em aberto - uma linha por pena + mês
-    df_open = df_clean[df_clean['status_categoria'] == 'OPEN'].copy()
-    devedores_por_mes = pd.DataFrame()
-    
-    if len(df_open) > 0:
-        # Primeiro, calcular total de boletos por pena_agua (para exibição informativa)
-        qtd_boletos_por_pena = df_open.groupby(['pena_agua', 'nome_pagador', 'banco']).size().reset_index(name='qtd_boletos_total')
-        
-        # Agrupar por pena, nome, banco E mês para ter uma linha por mês
-        # Manter count para saber quantos boletos há naquele mês específico (para remoção)
-        devedores_por_mes = df_open.groupby(['pena_agua', 'nome_pagador', 'banco', 'mes_referencia']).agg({
-            'valor_float': ['sum', 'count']
-        }).reset_index()
-        devedores_por_mes.columns = ['pena_agua', 'nome', 'banco', 'mes', 'valor_total', 'qtd_boletos_mes']
-        
-        # Adicionar quantidade total de boletos por pena (não por mês) - para exibição
-        # Renomear 'nome' temporariamente para fazer o merge
-        devedores_por_mes_temp = devedores_por_mes.rename(columns={'nome': 'nome_pagador'})
-        devedores_por_mes_temp = devedores_por_mes_temp.merge(
-            qtd_boletos_por_pena[['pena_agua', 'nome_pagador', 'banco', 'qtd_boletos_total']],
-            on=['pena_agua', 'nome_pagador', 'banco'],
-            how='left'
-        )
-        devedores_por_mes = devedores_por_mes_temp.rename(columns={'nome_pagador': 'nome'})
-        devedores_por_mes = devedores_por_mes.sort_values('valor_total', ascending=False)
-        
-        for _, row in devedores_por_mes.iterrows():
-            # Criar ID único para esta combinação pena + mês
-            unique_id = f"{row['pena_agua']}_{row['mes']}"
-            qtd_boletos_total = int(row.get('qtd_boletos_total', 0))
-            html_content.append(f"""
-            <tr class="debtor-row" data-pena="{row['pena_agua']}" data-mes="{row['mes']}" data-unique-id="{unique_id}" data-valor="{row['valor_total']}" data-qtd="{qtd_boletos_total}">
-                <td>
-                    <button class="remove-btn" onclick="removerPenaPorMes('{row['pena_agua']}', '{row['mes']}', event)" title="Dar baixa apenas deste mês">−</button>
-                </td>
-                <td data-value="{row['pena_agua']}"><strong>{row['pena_agua']}</strong></td>
-                <td data-value="{repr(row['nome'])}">{row['nome']}</td>
-                <td data-value="{repr(row['banco'])}">{row['banco']}</td>
-                <td data-value="{row['valor_total']}">{format_currency(row['valor_total'])}</td>
-                <td data-value="{qtd_boletos_total}">{qtd_boletos_total}</td>
-                <td data-value="{repr(str(row['mes']))}">{row['mes']}</td>
-            </tr>
-""")
-    else:
-        html_content.append("<tr><td colspan='7'>Nenhum devedor em aberto encontrado.</td></tr>")
-    
-    html_content.append("</tbody></table>")
-    
-    # JavaScript para interatividade
-    # Preparar dados temporais para o gráfico
-    temporal_data_js = []
-    if len(temporal_df) > 0:
-        for _, row in temporal_df.iterrows():
-            temporal_data_js.append(f"""            {{
-                "mes": {repr(str(row['mes_referencia']))},
-                "divida": {row['soma_divida_open']}
-            }}""")
-    
-    html_content.append("""
-    <script>
-        // Dados temporais para o gráfico
-        const temporalData = [
-""")
-    if temporal_data_js:
-        html_content.append(',\n'.join(temporal_data_js))
-    html_content.append("""
-        ];
-        
-        // Dados originais
-        const originalData = {
-            devedores: """ + str(metrics['total_devedores_unicos']) + """,
-            boletos: """ + str(metrics['total_boletos_em_aberto']) + """,
-            divida: """ + str(metrics['soma_divida_em_aberto']) + """,
-            ticket: """ + str(metrics['ticket_medio_em_aberto']) + """
-        };
-        
-        // Dados dos devedores
-        const devedoresData = {
-""")
-    
-    # Adicionar dados dos devedores em formato JSON
-    # Para busca por pena (remove todos os meses)
-    devedores_agrupados = pd.DataFrame()
-    if len(df_open) > 0:
-        devedores_agrupados = df_open.groupby(['pena_agua', 'nome_pagador', 'banco']).agg({
-            'valor_float': ['sum', 'count']
-        }).reset_index()
-        devedores_agrupados.columns = ['pena_agua', 'nome', 'banco', 'valor_total', 'qtd_boletos']
-    
-    if len(devedores_agrupados) > 0:
-        devedores_json = []
-        for _, row in devedores_agrupados.iterrows():
-            devedores_json.append(f"""            "{row['pena_agua']}": {{
-                "nome": {repr(row['nome'])},
-                "banco": {repr(row['banco'])},
-                "valor": {row['valor_total']},
-                "qtd_boletos": {int(row['qtd_boletos'])}
-            }}""")
-        html_content.append(',\n'.join(devedores_json))
-    
-    html_content.append("""
-        };
-        
-        // Dados dos devedores por mês (para remoção individual)
-        const devedoresPorMesData = {
-""")
-    
-    # Adicionar dados por pena + mês
-    if len(devedores_por_mes) > 0:
-        devedores_mes_json = []
-        for _, row in devedores_por_mes.iterrows():
-            unique_id = f"{row['pena_agua']}_{row['mes']}"
-            qtd_boletos_total = int(row.get('qtd_boletos_total', 0))
-            qtd_boletos_mes = int(row.get('qtd_boletos_mes', 0))  # Quantidade do mês específico (para remoção)
-            devedores_mes_json.append(f"""            "{unique_id}": {{
-                "pena": {repr(str(row['pena_agua']))},
-                "nome": {repr(row['nome'])},
-                "banco": {repr(row['banco'])},
-                "mes": {repr(str(row['mes']))},
-                "valor": {row['valor_total']},
-                "qtd_boletos": {qtd_boletos_mes},
-                "qtd_boletos_total": {qtd_boletos_total}
-            }}""")
-        html_content.append(',\n'.join(devedores_mes_json))
-    
-    html_content.append("""
-        };
-        
-        // Dados dos boletos individuais (para maior/menor boleto)
-        const boletosIndividuais = [
-""")
-    
-    # Adicionar dados de todos os boletos individuais
-    if len(df_open) > 0:
-        boletos_json = []
-        for _, row in df_open.iterrows():
-            vencimento_str = row['data_vencimento_dt'].strftime('%d/%m/%Y') if pd.notna(row['data_vencimento_dt']) else 'N/A'
-            boletos_json.append(f"""            {{
-                "valor": {row['valor_float']},
-                "nome": {repr(row['nome_pagador'])},
-                "pena_agua": {repr(str(row['pena_agua']))},
-                "vencimento": {repr(vencimento_str)},
-                "banco": {repr(row['banco'])},
-                "numero_nosso": {repr(str(row.get('numero_nosso', 'N/A')))},
-                "mes": {repr(str(row['mes_referencia']))},
-                "unique_id": {repr(f"{row['pena_agua']}_{row['mes_referencia']}")}
-            }}""")
-        html_content.append(',\n'.join(boletos_json))
-    
-    html_content.append("""
-        ];
-        
-        // Número do relatório para chave única no localStorage
-        const report_number = """ + str(report_number) + """;
-        
-        const removedPenas = new Set(); // Pena completa (todos os meses)
-        const removedPenasPorMes = new Set(); // Pena + mês específico
+"""
+
+# Colunas exibidas nas tabelas de pioras e melhoras
+_COLUNAS_MUDANCA = [
+    'pena_agua', 'nome', 'mes_anterior', 'mes_atual',
+    'divida_mes_anterior', 'divida_mes_atual', 'delta', 'pct_delta'
+]
+
+_METRICAS_NUMERO = ('total_devedores_unicos', 'total_boletos_em_aberto')
+_METRICAS_MOEDA = (
+    'soma_divida_em_aberto', 'ticket_medio_em_aberto', 'valor_medio', 'valor_mediana',
+    'valor_moda', 'valor_desvio_padrao', 'valor_p90', 'valor_p95'
+)
+
+# Troca milhar e decimal para o padrão brasileiro numa única passada
+_SEPARADORES_BR = str.maketrans({',': '.', '.': ','})
+
+
+# Script da interatividade (baixas, filtros, ordenação e exportação), escrito
+# logo após os dados em JavaScript e a constante report_number
+_HTML_SCRIPT_INTERATIVO = """        
+        const removedPenas = new Set(); // Pena completa (todos os meses)
+        const removedPenasPorMes = new Set(); // Pena + mês específico
         
         // Chave única para este relatório
         const storageKey = 'relatorio_baixas_' + report_number;
@@ -1972,22 +1422,818 @@ def generate_html_report(
             initTableSorting();
         }
     </script>
-    """)
+    """
+
+
+def format_currency(value: float) -> str:
+    """Formata valor como moeda brasileira."""
+    return f"R$ {value:,.2f}".translate(_SEPARADORES_BR)
+
+
+def format_currency_series(values: pd.Series) -> pd.Series:
+    """Formata uma coluna inteira como moeda brasileira (mesmo resultado de format_currency)."""
+    return 'R$ ' + values.map('{:,.2f}'.format).astype(str).str.translate(_SEPARADORES_BR)
+
+
+def format_number(value: float) -> str:
+    """Formata número com separador de milhar."""
+    return f"{value:,.0f}".translate(_SEPARADORES_BR)
+
+
+def format_number_series(values: pd.Series) -> pd.Series:
+    """Formata uma coluna inteira com separador de milhar (mesmo resultado de format_number)."""
+    return values.map('{:,.0f}'.format).astype(str).str.translate(_SEPARADORES_BR)
+
+
+def format_percent(value: float) -> str:
+    """Formata percentual."""
+    return f"{value:.2f}%"
+
+
+def _truncar_nome(nomes: pd.Series, limite: int) -> pd.Series:
+    """Corta nomes longos em `limite` caracteres, acrescentando '...'."""
+    return nomes.str.slice(0, limite) + np.where(nomes.str.len() > limite, '...', '')
+
+
+def _texto_js(valor) -> str:
+    """
+    Converte um valor em literal JavaScript (JSON). '</' é escapado para que
+    um texto não feche a tag <script>.
+    """
+    return json.dumps(valor, ensure_ascii=False).replace('</', '<\\/')
+
+
+@lru_cache(maxsize=200_000)
+def _texto_js_repetido(valor) -> str:
+    """
+    _texto_js com resultado memorizado, para valores que se repetem muito
+    entre as linhas (nomes, bancos, meses e datas).
+    """
+    return _texto_js(valor)
+
+
+def _objeto_js(chaves: pd.Series, valores: pd.DataFrame) -> str:
+    """
+    Serializa um objeto JavaScript {chave: {coluna: valor}} com um único
+    json.dumps. Chaves repetidas mantêm a última linha, como no literal JS.
+
+    Args:
+        chaves: Chave de cada linha
+        valores: Campos de cada linha, na ordem em que devem aparecer
+
+    Returns:
+        Literal JavaScript do objeto
+    """
+    dados = dict(zip(chaves.astype(str), valores.to_dict('records')))
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def _linhas_html(modelo: str, separador: str = '\n', **colunas: pd.Series) -> str:
+    """
+    Monta as linhas de uma tabela HTML (ou itens de um literal JavaScript)
+    preenchendo o modelo com colunas já formatadas como texto. A concatenação
+    é feita coluna a coluna, sem percorrer o DataFrame linha a linha.
     
-    # Rodapé
-    html_content.append("""
-        <div class="footer">
-            <p>Relatório gerado automaticamente pelo Sistema de Análise de Inadimplência</p>
-            <p>Foco: Identificação e acompanhamento de devedores e inadimplência</p>
-        </div>
-    </div>
-</body>
-</html>
-""")
+    Args:
+        modelo: Modelo de uma linha, com campos no formato {nome}
+        separador: Texto colocado entre as linhas (default: quebra de linha)
+        **colunas: Séries de texto para cada campo do modelo (mesmo índice)
+        
+    Returns:
+        Linhas unidas pelo separador
+    """
+    linhas = ''
+    for literal, campo, _, _ in Formatter().parse(modelo):
+        linhas = linhas + literal
+        if campo is not None:
+            linhas = linhas + colunas[campo]
+    return separador.join(linhas)
+
+
+def generate_html_report(
+    metrics: Dict[str, Any],
+    metrics_by_bank: pd.DataFrame,
+    max_min_boleto: Dict[str, Any],
+    temporal_df: pd.DataFrame,
+    ranking_total: pd.DataFrame,
+    ranking_recurrence: pd.DataFrame,
+    debt_change: pd.DataFrame,
+    data_quality: Dict[str, Any],
+    status_classifier,
+    df_clean: pd.DataFrame,
+    output_dir: str,
+    report_number: int
+):
+    """
+    Gera relatório HTML completo.
+    
+    Args:
+        metrics: Dicionário com métricas gerais
+        metrics_by_bank: DataFrame com métricas por banco
+        max_min_boleto: Dicionário com maior e menor boleto
+        temporal_df: DataFrame com evolução temporal
+        ranking_total: Ranking por dívida total
+        ranking_recurrence: Ranking por reincidência
+        debt_change: Mudanças mês a mês
+        data_quality: Dicionário com métricas de qualidade
+        status_classifier: Instância de StatusClassifier
+        output_dir: Diretório de saída
+    """
+    logger.info("Gerando relatório HTML...")
+    
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
     
-    # Salvar arquivo
+    # Os trechos são gravados direto no arquivo, sem montar o documento
+    # inteiro em memória
     output_file = output_path / f"relatorio_inadimplencia_{report_number}.html"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(html_content))
+    with open(output_file, 'w', encoding='utf-8', buffering=HTML_BUFFER_SIZE) as f:
+        _write_html_content(
+            _escritor_html(f),
+            metrics,
+            metrics_by_bank,
+            max_min_boleto,
+            temporal_df,
+            ranking_total,
+            ranking_recurrence,
+            debt_change,
+            data_quality,
+            status_classifier,
+            df_clean,
+            report_number
+        )
     
     logger.info(f"Relatório HTML gerado: {output_file}")
+
+
+def _escritor_html(f):
+    """
+    Cria a função que grava os trechos do HTML no arquivo, separados por
+    quebra de linha (mesmo resultado de '\\n'.join sobre os trechos).
+    
+    Args:
+        f: Arquivo de texto aberto para escrita
+        
+    Returns:
+        Função que recebe um trecho e o grava
+    """
+    separador = ''
+    
+    def escrever(trecho: str):
+        nonlocal separador
+        f.write(separador)
+        f.write(trecho)
+        separador = '\n'
+    
+    return escrever
+
+
+def _write_html_content(
+    escrever,
+    metrics: Dict[str, Any],
+    metrics_by_bank: pd.DataFrame,
+    max_min_boleto: Dict[str, Any],
+    temporal_df: pd.DataFrame,
+    ranking_total: pd.DataFrame,
+    ranking_recurrence: pd.DataFrame,
+    debt_change: pd.DataFrame,
+    data_quality: Dict[str, Any],
+    status_classifier,
+    df_clean: pd.DataFrame,
+    report_number: int
+):
+    """
+    Gera o conteúdo do relatório HTML, trecho a trecho.
+    
+    Os demais argumentos são os mesmos de generate_html_report.
+    
+    Args:
+        escrever: Função que grava cada trecho (ver _escritor_html)
+    """
+    # Cabeçalho
+    escrever(_HTML_CABECALHO.substitute(
+        report_number=report_number,
+        data_geracao=datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    ))
+    
+    # Gráfico de Evolução da Dívida Total
+    escrever("""
+        <div style="background-color: white; border: 2px solid #1976d2; border-radius: 8px; padding: 25px; margin: 30px 0;">
+            <h2 style="margin-top: 0; color: #1976d2; text-align: center;">📈 Evolução da Dívida Total ao Longo dos Meses</h2>
+            <div style="position: relative; height: 400px; margin: 20px 0;">
+                <canvas id="debtEvolutionChart"></canvas>
+            </div>
+            <div id="debtEvolutionValues" style="margin-top: 20px; text-align: center; font-size: 14px; color: #555;"></div>
+        </div>
+    """)
+    
+    # Painel Interativo de Baixa Manual
+    escrever("""
+        <div class="interactive-panel">
+            <h2 style="margin-top: 0; color: #1976d2;">🔧 Baixa Manual de Inadimplência</h2>
+            <p>Digite a pena de água para dar baixa manual (ex: pessoa já pagou mas ainda consta como em aberto).</p>
+            <div class="search-box">
+                <input type="text" id="penaInput" placeholder="Digite a pena de água (ex: 436)" />
+                <button onclick="removerPena()">Dar Baixa</button>
+                <button onclick="resetarBaixas()" style="background-color: #757575;">Resetar Todas</button>
+                <button onclick="salvarMudancas()" style="background-color: #4caf50; margin-left: 10px;" id="btnSalvar" title="Salvar mudanças no arquivo HTML (para portabilidade)">
+                    💾 Salvar Mudanças
+                </button>
+            </div>
+            <div id="removedPenas" style="margin-top: 10px;"></div>
+            <div id="saveStatus" style="margin-top: 10px; font-size: 14px; color: #4caf50; display: none;"></div>
+        </div>
+        <div id="toastNotification" style="position: fixed; top: 20px; right: 20px; background-color: #4caf50; color: white; padding: 20px 30px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.3); z-index: 10000; display: none; font-size: 16px; font-weight: bold; animation: slideIn 0.3s ease-out;">
+            ✓ Mudanças salvas com sucesso!
+        </div>
+    """)
+    
+    # KPIs e estatísticas formatados uma única vez
+    metricas_fmt = {chave: format_number(metrics[chave]) for chave in _METRICAS_NUMERO}
+    metricas_fmt.update({chave: format_currency(metrics[chave]) for chave in _METRICAS_MOEDA})
+    
+    # 1. KPIs Gerais (apenas OPEN)
+    escrever("""
+        <h2>1. Panorama Geral de Inadimplência</h2>
+        <div class="kpi-grid">
+""")
+    
+    escrever(_HTML_KPIS.format_map(metricas_fmt))
+    
+    # Estatísticas descritivas
+    escrever("""
+        <h3>Estatísticas Descritivas (Valores em Aberto)</h3>
+        <table>
+            <tr>
+                <th>Métrica</th>
+                <th>Valor</th>
+            </tr>
+""")
+    
+    escrever(_HTML_ESTATISTICAS.format_map(metricas_fmt))
+    
+    # Maior e menor dívida individual
+    escrever("""
+        <h3>Maior e Menor Dívida Individual</h3>
+        <table id="maxMinDebtTable">
+            <tr>
+                <th>Métrica</th>
+                <th>Pena de Água</th>
+                <th>Nome</th>
+                <th>Valor</th>
+            </tr>
+""")
+    
+    if metrics['maior_divida_person_id']:
+        escrever(f"""
+            <tr id="maior-divida-row">
+                <td><strong>Maior Dívida</strong></td>
+                <td id="maior-divida-pena">{metrics['maior_divida_pena_agua']}</td>
+                <td id="maior-divida-nome">{metrics['maior_divida_nome']}</td>
+                <td id="maior-divida-valor">{format_currency(metrics['maior_divida_individual'])}</td>
+            </tr>
+""")
+    
+    if metrics['menor_divida_person_id']:
+        escrever(f"""
+            <tr id="menor-divida-row">
+                <td><strong>Menor Dívida</strong></td>
+                <td id="menor-divida-pena">{metrics['menor_divida_pena_agua']}</td>
+                <td id="menor-divida-nome">{metrics['menor_divida_nome']}</td>
+                <td id="menor-divida-valor">{format_currency(metrics['menor_divida_individual'])}</td>
+            </tr>
+""")
+    
+    escrever("</table>")
+    
+    # 2. Máximos e mínimos de boletos
+    escrever("""
+        <h2>2. Boletos com Maior e Menor Valor em Aberto</h2>
+""")
+    
+    boleto_max = max_min_boleto.get('boleto_open_max')
+    boleto_min = max_min_boleto.get('boleto_open_min')
+    
+    if boleto_max:
+        escrever(f"""
+        <h3>Maior Boleto em Aberto</h3>
+        <table>
+            <tr><th>Campo</th><th>Valor</th></tr>
+            <tr><td>Valor</td><td class="dynamic" id="boleto-max-valor">{format_currency(boleto_max['valor'])}</td></tr>
+            <tr><td>Nome</td><td class="dynamic" id="boleto-max-nome">{boleto_max['nome']}</td></tr>
+            <tr><td>Pena de Água</td><td class="dynamic" id="boleto-max-pena">{boleto_max['pena_agua']}</td></tr>
+            <tr><td>Vencimento</td><td class="dynamic" id="boleto-max-vencimento">{boleto_max['vencimento'].strftime('%d/%m/%Y') if boleto_max['vencimento'] else 'N/A'}</td></tr>
+            <tr><td>Banco</td><td class="dynamic" id="boleto-max-banco">{boleto_max['banco']}</td></tr>
+            <tr><td>Número Nosso</td><td class="dynamic" id="boleto-max-numero">{boleto_max['numero_nosso']}</td></tr>
+        </table>
+""")
+    
+    if boleto_min:
+        escrever(f"""
+        <h3>Menor Boleto em Aberto</h3>
+        <table>
+            <tr><th>Campo</th><th>Valor</th></tr>
+            <tr><td>Valor</td><td class="dynamic" id="boleto-min-valor">{format_currency(boleto_min['valor'])}</td></tr>
+            <tr><td>Nome</td><td class="dynamic" id="boleto-min-nome">{boleto_min['nome']}</td></tr>
+            <tr><td>Pena de Água</td><td class="dynamic" id="boleto-min-pena">{boleto_min['pena_agua']}</td></tr>
+            <tr><td>Vencimento</td><td class="dynamic" id="boleto-min-vencimento">{boleto_min['vencimento'].strftime('%d/%m/%Y') if boleto_min['vencimento'] else 'N/A'}</td></tr>
+            <tr><td>Banco</td><td class="dynamic" id="boleto-min-banco">{boleto_min['banco']}</td></tr>
+            <tr><td>Número Nosso</td><td class="dynamic" id="boleto-min-numero">{boleto_min['numero_nosso']}</td></tr>
+        </table>
+""")
+    
+    # 2.5. Análise por Banco
+    escrever("""
+        <h2>2.5. Análise de Inadimplência por Banco</h2>
+""")
+    
+    if not metrics_by_bank.empty:
+        escrever("""
+        <h3>Métricas por Banco</h3>
+        <table>
+            <tr>
+                <th>Banco</th>
+                <th>Soma da Dívida</th>
+                <th>Valor Médio</th>
+                <th>Valor Mediana</th>
+                <th>Desvio Padrão</th>
+                <th>P90</th>
+                <th>P95</th>
+                <th>Qtd Boletos</th>
+                <th>Qtd Devedores Únicos</th>
+                <th>Ticket Médio</th>
+            </tr>
+""")
+        escrever(_linhas_html("""
+            <tr>
+                <td><strong>{banco}</strong></td>
+                <td>{soma_divida}</td>
+                <td>{valor_medio}</td>
+                <td>{valor_mediana}</td>
+                <td>{valor_desvio_padrao}</td>
+                <td>{valor_p90}</td>
+                <td>{valor_p95}</td>
+                <td>{qtd_boletos}</td>
+                <td>{qtd_devedores_unicos}</td>
+                <td>{ticket_medio}</td>
+            </tr>
+""",
+            banco=metrics_by_bank['banco'].astype(str),
+            soma_divida=format_currency_series(metrics_by_bank['soma_divida']),
+            valor_medio=format_currency_series(metrics_by_bank['valor_medio']),
+            valor_mediana=format_currency_series(metrics_by_bank['valor_mediana']),
+            valor_desvio_padrao=format_currency_series(metrics_by_bank['valor_desvio_padrao']),
+            valor_p90=format_currency_series(metrics_by_bank['valor_p90']),
+            valor_p95=format_currency_series(metrics_by_bank['valor_p95']),
+            qtd_boletos=format_number_series(metrics_by_bank['qtd_boletos']),
+            qtd_devedores_unicos=format_number_series(metrics_by_bank['qtd_devedores_unicos']),
+            ticket_medio=format_currency_series(metrics_by_bank['ticket_medio'])
+        ))
+        escrever("</table>")
+        
+        # Gráfico de barras por banco (soma da dívida)
+        escrever("""
+        <h3>Comparação de Dívida Total por Banco</h3>
+        <p><em>Os valores estão ordenados do maior para o menor.</em></p>
+        <table>
+            <tr>
+                <th>Banco</th>
+                <th>Soma da Dívida</th>
+                <th>% do Total</th>
+            </tr>
+""")
+        total_geral = metrics_by_bank['soma_divida'].sum()
+        if total_geral > 0:
+            pct = metrics_by_bank['soma_divida'] / total_geral * 100
+        else:
+            pct = pd.Series(0.0, index=metrics_by_bank.index)
+        escrever(_linhas_html("""
+            <tr>
+                <td><strong>{banco}</strong></td>
+                <td>{soma_divida}</td>
+                <td>{pct}</td>
+            </tr>
+""",
+            banco=metrics_by_bank['banco'].astype(str),
+            soma_divida=format_currency_series(metrics_by_bank['soma_divida']),
+            pct=pct.map(format_percent)
+        ))
+        escrever("</table>")
+    else:
+        escrever("<p>Nenhum dado disponível para análise por banco.</p>")
+    
+    # 3. Ranking de devedores
+    escrever("""
+        <h2>3. Ranking de Devedores</h2>
+""")
+    
+    if not ranking_total.empty:
+        escrever("""
+        <h3>Top 10 por Dívida Total</h3>
+        <table>
+            <tr>
+                <th>Rank</th>
+                <th>Pena de Água</th>
+                <th>Nome</th>
+                <th>Dívida Total</th>
+                <th>Status Mais Comum</th>
+            </tr>
+""")
+        escrever(_linhas_html("""
+            <tr>
+                <td>{rank}</td>
+                <td>{pena_agua}</td>
+                <td>{nome}</td>
+                <td>{divida_total}</td>
+                <td><span class="badge badge-danger">{status_mais_comum}</span></td>
+            </tr>
+""",
+            rank=ranking_total['rank'].astype(int).astype(str),
+            pena_agua=ranking_total['pena_agua'].astype(str),
+            nome=_truncar_nome(ranking_total['nome'], 50),
+            divida_total=format_currency_series(ranking_total['divida_total']),
+            status_mais_comum=ranking_total['status_mais_comum'].astype(str)
+        ))
+        escrever("</table>")
+    
+    if not ranking_recurrence.empty:
+        escrever("""
+        <h3>Top 10 por Reincidência (Quantidade de Boletos)</h3>
+        <table>
+            <tr>
+                <th>Rank</th>
+                <th>Pena de Água</th>
+                <th>Nome</th>
+                <th>Qtd Boletos</th>
+                <th>Meses Apareceu</th>
+                <th>Dívida Total</th>
+            </tr>
+""")
+        escrever(_linhas_html("""
+            <tr>
+                <td>{rank}</td>
+                <td>{pena_agua}</td>
+                <td>{nome}</td>
+                <td>{qtd_boletos_open}</td>
+                <td>{meses_apareceu}</td>
+                <td>{soma_open}</td>
+            </tr>
+""",
+            rank=ranking_recurrence['rank'].astype(int).astype(str),
+            pena_agua=ranking_recurrence['pena_agua'].astype(str),
+            nome=_truncar_nome(ranking_recurrence['nome'], 50),
+            qtd_boletos_open=ranking_recurrence['qtd_boletos_open'].astype(int).astype(str),
+            meses_apareceu=ranking_recurrence['meses_apareceu'].astype(int).astype(str),
+            soma_open=format_currency_series(ranking_recurrence['soma_open'])
+        ))
+        escrever("</table>")
+    
+    # 4. Evolução temporal
+    escrever("""
+        <h2>4. Evolução Temporal da Inadimplência</h2>
+""")
+    
+    if not temporal_df.empty:
+        escrever("""
+        <table>
+            <tr>
+                <th>Mês</th>
+                <th>Soma Dívida em Aberto</th>
+                <th>Qtd Boletos em Aberto</th>
+                <th>Qtd Devedores Únicos</th>
+                <th>Valor Médio em Aberto</th>
+            </tr>
+""")
+        escrever(_linhas_html("""
+            <tr>
+                <td>{mes_referencia}</td>
+                <td>{soma_divida_open}</td>
+                <td>{qtd_boletos_open}</td>
+                <td>{qtd_devedores_open_unicos}</td>
+                <td>{valor_medio_open}</td>
+            </tr>
+""",
+            mes_referencia=temporal_df['mes_referencia'].astype(str),
+            soma_divida_open=format_currency_series(temporal_df['soma_divida_open']),
+            qtd_boletos_open=format_number_series(temporal_df['qtd_boletos_open']),
+            qtd_devedores_open_unicos=format_number_series(temporal_df['qtd_devedores_open_unicos']),
+            valor_medio_open=format_currency_series(temporal_df['valor_medio_open'])
+        ))
+        escrever("</table>")
+    
+    # 5. Pioras e melhoras
+    escrever("""
+        <h2>5. Pioras e Melhoras (Mudanças Mês a Mês)</h2>
+""")
+    
+    if not debt_change.empty:
+        # Seleciona só as 10 linhas e as colunas exibidas, numa única cópia
+        colunas = [debt_change.columns.get_loc(coluna) for coluna in _COLUNAS_MUDANCA]
+        top_pioras = debt_change.iloc[get_top_n_positions(debt_change['delta'], 10), colunas]
+        top_melhoras = debt_change.iloc[get_top_n_positions(debt_change['delta'], 10, largest=False), colunas]
+        
+        escrever("""
+        <h3>Top 10 Maiores Aumentos de Dívida</h3>
+        <table>
+            <tr>
+                <th>Pena de Água</th>
+                <th>Nome</th>
+                <th>Mês Anterior</th>
+                <th>Mês Atual</th>
+                <th>Dívida Anterior</th>
+                <th>Dívida Atual</th>
+                <th>Delta</th>
+                <th>% Delta</th>
+            </tr>
+""")
+        escrever(_linhas_html("""
+            <tr>
+                <td>{pena_agua}</td>
+                <td>{nome}</td>
+                <td>{mes_anterior}</td>
+                <td>{mes_atual}</td>
+                <td>{divida_mes_anterior}</td>
+                <td>{divida_mes_atual}</td>
+                <td><span class="badge badge-danger">+{delta}</span></td>
+                <td>+{pct_delta}</td>
+            </tr>
+""",
+            pena_agua=top_pioras['pena_agua'].astype(str),
+            nome=_truncar_nome(top_pioras['nome'], 40),
+            mes_anterior=top_pioras['mes_anterior'].astype(str),
+            mes_atual=top_pioras['mes_atual'].astype(str),
+            divida_mes_anterior=format_currency_series(top_pioras['divida_mes_anterior']),
+            divida_mes_atual=format_currency_series(top_pioras['divida_mes_atual']),
+            delta=format_currency_series(top_pioras['delta']),
+            pct_delta=top_pioras['pct_delta'].map(format_percent)
+        ))
+        escrever("</table>")
+        
+        escrever("""
+        <h3>Top 10 Maiores Reduções de Dívida</h3>
+        <table>
+            <tr>
+                <th>Pena de Água</th>
+                <th>Nome</th>
+                <th>Mês Anterior</th>
+                <th>Mês Atual</th>
+                <th>Dívida Anterior</th>
+                <th>Dívida Atual</th>
+                <th>Delta</th>
+                <th>% Delta</th>
+            </tr>
+""")
+        escrever(_linhas_html("""
+            <tr>
+                <td>{pena_agua}</td>
+                <td>{nome}</td>
+                <td>{mes_anterior}</td>
+                <td>{mes_atual}</td>
+                <td>{divida_mes_anterior}</td>
+                <td>{divida_mes_atual}</td>
+                <td><span class="badge badge-success">{delta}</span></td>
+                <td>{pct_delta}</td>
+            </tr>
+""",
+            pena_agua=top_melhoras['pena_agua'].astype(str),
+            nome=_truncar_nome(top_melhoras['nome'], 40),
+            mes_anterior=top_melhoras['mes_anterior'].astype(str),
+            mes_atual=top_melhoras['mes_atual'].astype(str),
+            divida_mes_anterior=format_currency_series(top_melhoras['divida_mes_anterior']),
+            divida_mes_atual=format_currency_series(top_melhoras['divida_mes_atual']),
+            delta=format_currency_series(top_melhoras['delta']),
+            pct_delta=top_melhoras['pct_delta'].map(format_percent)
+        ))
+        escrever("</table>")
+    
+    # 6. Qualidade de dados
+    escrever("""
+        <h2>6. Qualidade dos Dados</h2>
+        <table>
+            <tr>
+                <th>Métrica</th>
+                <th>Valor</th>
+            </tr>
+""")
+    
+    escrever(f"""
+            <tr><td>Total de Linhas</td><td>{format_number(data_quality['total_linhas'])}</td></tr>
+            <tr><td>Linhas com Valor Inválido</td><td>{format_number(data_quality['qtd_linhas_invalidas_valor'])} ({format_percent(data_quality['pct_linhas_invalidas_valor'])})</td></tr>
+            <tr><td>Linhas com Data Inválida</td><td>{format_number(data_quality['qtd_linhas_invalidas_data'])} ({format_percent(data_quality['pct_linhas_invalidas_data'])})</td></tr>
+            <tr><td>Duplicidades (Banco + Número Nosso)</td><td>{format_number(data_quality['duplicidades_banco_numero_nosso'])}</td></tr>
+            <tr><td>Duplicidades (Banco + Número Seu)</td><td>{format_number(data_quality['duplicidades_banco_numero_seu'])}</td></tr>
+        </table>
+""")
+    
+    # Status desconhecidos
+    unknown_statuses = status_classifier.get_unknown_statuses()
+    if unknown_statuses:
+        escrever("""
+        <h3>Status Desconhecidos (Não Classificados)</h3>
+        <p>Os seguintes status foram encontrados mas não foram classificados como PAGO ou EM ABERTO:</p>
+        <ul>
+""")
+        escrever('\n'.join(f"<li><code>{status}</code></li>" for status in sorted(unknown_statuses)))
+        escrever("</ul>")
+        escrever("<p><strong>Recomendação:</strong> Revise as regras de classificação usando --paid-status e --open-status.</p>")
+    
+    # 7. Lista Completa de Devedores em Aberto
+    escrever("""
+        <h2>7. Lista Completa de Devedores em Aberto</h2>
+        <p><em>Lista completa ordenada por valor em aberto (maior para menor). Use para verificação se realmente estão em aberto.</em></p>
+        <table id="debtorsTable">
+            <thead>
+            <tr>
+                <th style="width: 50px;">Ação</th>
+                <th class="sortable" data-sort="pena" data-type="number">Pena de Água</th>
+                <th class="sortable" data-sort="nome" data-type="text">Nome</th>
+                <th class="sortable" data-sort="banco" data-type="text">Banco</th>
+                <th class="sortable sort-desc" data-sort="valor" data-type="number">Valor em Aberto</th>
+                <th class="sortable" data-sort="qtd" data-type="number">Qtd Boletos</th>
+                <th class="sortable" data-sort="mes" data-type="text">Meses</th>
+            </tr>
+            </thead>
+            <tbody>
+""")
+    
+    # Obter todos os devedores em aberto - uma linha por pena + mês
+    # Só as colunas usadas aqui e nos boletos individuais (seção JavaScript)
+    colunas_open = ['pena_agua', 'nome_pagador', 'banco', 'mes_referencia', 'valor_float', 'data_vencimento_dt']
+    if 'numero_nosso' in df_clean.columns:
+        colunas_open.append('numero_nosso')
+    df_open = get_df_open(df_clean, colunas_open)
+    devedores_por_mes = pd.DataFrame()
+    devedores_agrupados = pd.DataFrame()
+    
+    if not df_open.empty:
+        # Agrupar por pena, nome, banco E mês para ter uma linha por mês
+        # Manter count para saber quantos boletos há naquele mês específico (para remoção)
+        # e size para o total de boletos da pena (inclui valores inválidos)
+        devedores_por_mes = df_open.groupby(['pena_agua', 'nome_pagador', 'banco', 'mes_referencia'], observed=True).agg(
+            valor_total=('valor_float', 'sum'),
+            qtd_boletos_mes=('valor_float', 'count'),
+            qtd_linhas=('valor_float', 'size')
+        ).reset_index()
+        devedores_por_mes = devedores_por_mes.rename(columns={'nome_pagador': 'nome', 'mes_referencia': 'mes'})
+        
+        # Agregado por pena (todos os meses) derivado do agrupamento mensal,
+        # sem percorrer df_open de novo
+        devedores_agrupados = devedores_por_mes.groupby(['pena_agua', 'nome', 'banco'], observed=True).agg(
+            valor_total=('valor_total', 'sum'),
+            qtd_boletos=('qtd_boletos_mes', 'sum'),
+            qtd_boletos_total=('qtd_linhas', 'sum')
+        ).reset_index()
+        
+        # Adicionar quantidade total de boletos por pena (não por mês) - para exibição
+        devedores_por_mes = devedores_por_mes.drop(columns='qtd_linhas').merge(
+            devedores_agrupados[['pena_agua', 'nome', 'banco', 'qtd_boletos_total']],
+            on=['pena_agua', 'nome', 'banco'],
+            how='left'
+        )
+        devedores_por_mes = devedores_por_mes.sort_values('valor_total', ascending=False)
+        
+        if not devedores_por_mes.empty:
+            # Colunas formatadas uma única vez; cada linha é uma combinação pena + mês
+            pena = devedores_por_mes['pena_agua'].astype(str)
+            mes = devedores_por_mes['mes'].astype(str)
+            nome = devedores_por_mes['nome'].astype(str)
+            banco = devedores_por_mes['banco'].astype(str)
+            valor = devedores_por_mes['valor_total'].map(str)
+            qtd_boletos_total = devedores_por_mes['qtd_boletos_total'].astype(int).astype(str)
+            escrever(_linhas_html("""
+            <tr class="debtor-row" data-pena="{pena}" data-mes="{mes}" data-unique-id="{unique_id}" data-valor="{valor}" data-qtd="{qtd}">
+                <td>
+                    <button class="remove-btn" onclick="removerPenaPorMes('{pena}', '{mes}', event)" title="Dar baixa apenas deste mês">−</button>
+                </td>
+                <td data-value="{pena}"><strong>{pena}</strong></td>
+                <td data-value="{nome_repr}">{nome}</td>
+                <td data-value="{banco_repr}">{banco}</td>
+                <td data-value="{valor}">{valor_fmt}</td>
+                <td data-value="{qtd}">{qtd}</td>
+                <td data-value="{mes_repr}">{mes}</td>
+            </tr>
+""",
+                    pena=pena,
+                    mes=mes,
+                    unique_id=pena + '_' + mes,
+                    valor=valor,
+                    qtd=qtd_boletos_total,
+                    nome=nome,
+                    nome_repr=nome.map(repr),
+                    banco=banco,
+                    banco_repr=banco.map(repr),
+                    valor_fmt=format_currency_series(devedores_por_mes['valor_total']),
+                    mes_repr=mes.map(repr)
+                ))
+    else:
+        escrever("<tr><td colspan='7'>Nenhum devedor em aberto encontrado.</td></tr>")
+    
+    escrever("</tbody></table>")
+    
+    # JavaScript para interatividade
+    # Preparar dados temporais para o gráfico
+    temporal_data_js = ''
+    if not temporal_df.empty:
+        temporal_data_js = _linhas_html("""            {{
+                "mes": {mes},
+                "divida": {divida}
+            }}""",
+            separador=',\n',
+            mes=temporal_df['mes_referencia'].astype(str).map(_texto_js_repetido),
+            divida=temporal_df['soma_divida_open'].map(str)
+        )
+    
+    # Dados dos devedores em formato JSON
+    # Para busca por pena (remove todos os meses): devedores_agrupados, calculado na seção 7
+    devedores_js = '{}'
+    if not devedores_agrupados.empty:
+        devedores_js = _objeto_js(
+            devedores_agrupados['pena_agua'],
+            devedores_agrupados[['nome', 'banco', 'valor_total', 'qtd_boletos']].astype({'qtd_boletos': int}).rename(
+                columns={'valor_total': 'valor'}
+            )
+        )
+    
+    # Dados por pena + mês; qtd_boletos é a quantidade do mês específico (para remoção)
+    devedores_por_mes_js = '{}'
+    if not devedores_por_mes.empty:
+        dados_mes = devedores_por_mes.assign(
+            pena=devedores_por_mes['pena_agua'].astype(str),
+            mes=devedores_por_mes['mes'].astype(str),
+            qtd_boletos=devedores_por_mes['qtd_boletos_mes'].astype(int),
+            qtd_boletos_total=devedores_por_mes['qtd_boletos_total'].astype(int)
+        )
+        devedores_por_mes_js = _objeto_js(
+            dados_mes['pena'] + '_' + dados_mes['mes'],
+            dados_mes[['pena', 'nome', 'banco', 'mes', 'valor_total', 'qtd_boletos', 'qtd_boletos_total']].rename(
+                columns={'valor_total': 'valor'}
+            )
+        )
+    
+    escrever("""
+    <script>
+        // Dados temporais para o gráfico
+        const temporalData = [
+""")
+    if temporal_data_js:
+        escrever(temporal_data_js)
+    escrever("""
+        ];
+        
+        // Dados originais
+        const originalData = {
+            devedores: """ + str(metrics['total_devedores_unicos']) + """,
+            boletos: """ + str(metrics['total_boletos_em_aberto']) + """,
+            divida: """ + str(metrics['soma_divida_em_aberto']) + """,
+            ticket: """ + str(metrics['ticket_medio_em_aberto']) + """
+        };
+        
+        // Dados dos devedores
+        const devedoresData = """ + devedores_js + """;
+        
+        // Dados dos devedores por mês (para remoção individual)
+        const devedoresPorMesData = """ + devedores_por_mes_js + """;
+        
+        // Dados dos boletos individuais (para maior/menor boleto)
+        const boletosIndividuais = [
+""")
+    
+    # Adicionar dados de todos os boletos individuais
+    if not df_open.empty:
+        pena = df_open['pena_agua'].astype(str)
+        mes = df_open['mes_referencia'].astype(str)
+        vencimento = df_open['data_vencimento_dt'].dt.strftime('%d/%m/%Y').fillna('N/A')
+        if 'numero_nosso' in df_open.columns:
+            numero_nosso = df_open['numero_nosso'].astype(str)
+        else:
+            numero_nosso = pd.Series('N/A', index=df_open.index)
+        escrever(_linhas_html("""            {{
+                "valor": {valor},
+                "nome": {nome},
+                "pena_agua": {pena},
+                "vencimento": {vencimento},
+                "banco": {banco},
+                "numero_nosso": {numero_nosso},
+                "mes": {mes},
+                "unique_id": {unique_id}
+            }}""",
+            separador=',\n',
+            valor=df_open['valor_float'].map(str),
+            nome=df_open['nome_pagador'].astype(object).map(_texto_js_repetido),
+            pena=pena.map(_texto_js),
+            vencimento=vencimento.map(_texto_js_repetido),
+            banco=df_open['banco'].astype(object).map(_texto_js_repetido),
+            numero_nosso=numero_nosso.map(_texto_js),
+            mes=mes.map(_texto_js_repetido),
+            unique_id=(pena + '_' + mes).map(_texto_js)
+        ))
+    
+    escrever("""
+        ];
+        
+        // Número do relatório para chave única no localStorage
+        const report_number = """ + str(report_number) + """;
+""" + _HTML_SCRIPT_INTERATIVO)
+    
+    # Rodapé
+    escrever(_HTML_RODAPE)
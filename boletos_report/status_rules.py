@@ -3,9 +3,11 @@ Classificação e normalização de status de boletos.
 Define regras para identificar boletos pagos vs em aberto.
 """
 
-import re
 import logging
 from typing import Set, Tuple, Optional
+import pandas as pd
+
+from boletos_report.utils import ESPACOS_REGEX
 
 logger = logging.getLogger(__name__)
 
@@ -76,7 +78,7 @@ class StatusClassifier:
         if not isinstance(status, str):
             return ""
         status = status.strip()
-        status = re.sub(r'\s+', ' ', status)
+        status = ESPACOS_REGEX.sub(' ', status)
         return status.upper()
     
     def is_paid(self, status: str) -> bool:
@@ -138,6 +140,26 @@ class StatusClassifier:
                 logger.warning(f"Status desconhecido encontrado: '{status_norm}' (original: '{status}')")
             return (status_norm, "UNKNOWN")
     
+    def classify_series(self, status: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """
+        Classifica uma coluna inteira de status.
+        Cada status distinto é classificado uma única vez e o resultado é
+        mapeado de volta para as linhas.
+        
+        Args:
+            status: Série com status originais
+            
+        Returns:
+            Tupla (série de status normalizados, série de categorias)
+        """
+        classificacao = {s: self.classify(s) for s in status.dropna().unique()}
+        vazio_norm, vazio_categoria = self.classify(None)
+        
+        status_norm = status.map({s: c[0] for s, c in classificacao.items()}).fillna(vazio_norm)
+        categoria = status.map({s: c[1] for s, c in classificacao.items()}).fillna(vazio_categoria)
+        
+        return (status_norm.astype(object), categoria.astype(object))
+    
     def get_unknown_statuses(self) -> Set[str]:
         """
         Retorna conjunto de status desconhecidos encontrados.
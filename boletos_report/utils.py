@@ -10,6 +10,9 @@ import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Sequências de espaços em branco (reduzidas a um único espaço)
+ESPACOS_REGEX = re.compile(r'\s+')
+
 
 def normalize_text(text: str) -> str:
     """
@@ -24,7 +27,7 @@ def normalize_text(text: str) -> str:
     if not isinstance(text, str):
         return ""
     text = text.strip()
-    text = re.sub(r'\s+', ' ', text)
+    text = ESPACOS_REGEX.sub(' ', text)
     return text.upper()
 
 
@@ -8,10 +8,14 @@ import pandas as pd
 from boletos_report.cleaning import (
     parse_valor,
     parse_data,
+    parse_valor_series,
+    parse_data_series,
     extract_pena_agua_from_name,
     derive_mes_referencia,
-    remove_duplicates_by_pena_month
+    remove_duplicates_by_pena_month,
+    clean_dataframe
 )
+from boletos_report.status_rules import StatusClassifier
 
 
 class TestParseValor:
@@ -87,6 +91,13 @@ class TestParseData:
         assert sucesso is True
         assert isinstance(data, datetime)
     
+    def test_parse_data_sem_zero_a_esquerda(self):
+        """Testa dia e mês com um dígito nos três formatos."""
+        for texto in ("2025-1-5", "5/1/2025", "5-1-2025"):
+            data, sucesso = parse_data(texto)
+            assert sucesso is True
+            assert data == datetime(2025, 1, 5)
+    
     def test_parse_data_datetime_object(self):
         """Testa datetime já como objeto."""
         dt = datetime(2025, 10, 15)
@@ -107,6 +118,56 @@ class TestParseData:
         assert data is None
 
 
+class TestParseValorSeries:
+    """Testes para parse_valor_series."""
+    
+    def test_parse_valor_series_equivale_ao_escalar(self):
+        """Testa que a versão vetorizada segue as regras de parse_valor."""
+        entradas = [
+            "1.161,41", "1161,41", "1161.41", "1000", "1.234.567", " 12,5 ", "abc", "", None,
+            "nan", "NaN", "1_000", "١٢٣"
+        ]
+        valores, sucesso = parse_valor_series(pd.Series(entradas, dtype=object))
+        
+        for entrada, valor, ok in zip(entradas, valores, sucesso):
+            esperado, esperado_ok = parse_valor(entrada)
+            assert ok == esperado_ok
+            assert abs(valor - esperado) < 0.01
+    
+    def test_parse_valor_series_numerica(self):
+        """Testa série já numérica."""
+        valores, sucesso = parse_valor_series(pd.Series([10.5, None]))
+        assert valores.tolist() == [10.5, 0.0]
+        assert sucesso.tolist() == [True, False]
+
+    def test_parse_valor_series_mista(self):
+        """Testa coluna com números e textos em formatos diferentes."""
+        entradas = pd.Series([1161.41, "1.161,41", 1000, "1.234.567", "R$ 10"], dtype=object)
+        valores, sucesso = parse_valor_series(entradas)
+        assert valores.tolist() == [1161.41, 1161.41, 1000.0, 1234567.0, 0.0]
+        assert sucesso.tolist() == [True, True, True, True, False]
+
+
+class TestParseDataSeries:
+    """Testes para parse_data_series."""
+    
+    def test_parse_data_series_formatos(self):
+        """Testa os três formatos aceitos e entradas inválidas."""
+        entradas = ["2025-10-15", "15/10/2025", "15-10-2025", " 2025-10-15 ", "invalid", None]
+        datas, sucesso = parse_data_series(pd.Series(entradas, dtype=object))
+        
+        assert sucesso.tolist() == [True, True, True, True, False, False]
+        assert all(d == pd.Timestamp(2025, 10, 15) for d in datas[:4])
+        assert datas[4:].isna().all()
+    
+    def test_parse_data_series_numerica(self):
+        """Testa coluna numérica (só NaN ou inteiros): nenhuma data válida, como em parse_data."""
+        for entradas in ([float("nan")], [20251015]):
+            datas, sucesso = parse_data_series(pd.Series(entradas))
+            assert datas.isna().all()
+            assert list(sucesso) == [parse_data(entrada)[1] for entrada in entradas]
+
+
 class TestExtractPenaAgua:
     """Testes para extração de pena_agua."""
     
@@ -222,3 +283,75 @@ class TestRemoveDuplicatesByPenaMonth:
         # Deve remover duplicata válida (436) mas manter inválidas
         assert len(result) == 4  # 1 válida + 3 inválidas
         assert len(result[result['pena_agua'] == '436']) == 1
+
+
+class TestCleanDataframe:
+    """Testes para clean_dataframe."""
+    
+    def test_clean_dataframe_preenche_pena_e_mes(self):
+        """Testa preenchimento de pena_agua e mes_referencia faltantes."""
+        df = pd.DataFrame({
+            'banco': ['banco1', 'banco2', 'banco1'],
+            'mes_referencia': [None, '2025-09', None],
+            'pena_agua': [None, '789', None],
+            'nome_pagador': ['436MELQUESEDEQUE CAXEADO', 'JOAO SILVA', 'SEM PENA'],
+            'status': ['VENCIDO', 'PAGO NO DIA', 'VENCIDO'],
+            'numero_seu': ['1', '2', '3'],
+            'numero_nosso': ['10', '20', '30'],
+            'data_vencimento': ['2025-10-15', '16/10/2025', 'invalid'],
+            'dda': ['N', 'S', 'N'],
+            'valor': ['1.161,41', '500.00', 'abc'],
+        })
+        
+        result = clean_dataframe(df, StatusClassifier()).set_index('numero_seu')
+        
+        assert result.loc['1', 'pena_agua'] == '436'
+        assert result.loc['1', 'nome_pagador'] == 'MELQUESEDEQUE CAXEADO'
+        assert result.loc['1', 'mes_referencia'] == '2025-10'
+        assert result.loc['1', 'person_id'] == '436|MELQUESEDEQUE CAXEADO'
+        assert result.loc['2', 'mes_referencia'] == '2025-09'
+        assert result.loc['3', 'nome_pagador'] == 'SEM PENA'
+        assert bool(result.loc['3', 'data_valida']) is False
+        assert bool(result.loc['3', 'valor_valido']) is False
+        assert isinstance(result['pena_agua'].dtype, pd.CategoricalDtype)
+        assert isinstance(result['banco'].dtype, pd.CategoricalDtype)
+    
+    def test_clean_dataframe_nao_altera_entrada(self):
+        """Testa que o DataFrame de entrada não é modificado."""
+        df = pd.DataFrame({
+            'banco': ['banco1'],
+            'pena_agua': [None],
+            'nome_pagador': ['436MELQUESEDEQUE CAXEADO'],
+            'status': ['VENCIDO'],
+            'numero_seu': ['1'],
+            'numero_nosso': ['10'],
+            'data_vencimento': ['2025-10-15'],
+            'dda': ['N'],
+            'valor': ['1.161,41'],
+        })
+        original = df.copy()
+        
+        clean_dataframe(df, StatusClassifier())
+        
+        pd.testing.assert_frame_equal(df, original)
+    
+    def test_clean_dataframe_nome_faltante(self):
+        """Testa linha sem nome e sem pena_agua."""
+        df = pd.DataFrame({
+            'banco': ['banco1', 'banco1'],
+            'mes_referencia': ['2025-10', '2025-10'],
+            'pena_agua': [None, None],
+            'nome_pagador': [None, '12 MARIA'],
+            'status': ['VENCIDO', 'VENCIDO'],
+            'numero_seu': ['1', '2'],
+            'numero_nosso': ['10', '20'],
+            'data_vencimento': ['2025-10-15', '2025-10-15'],
+            'dda': ['N', 'N'],
+            'valor': ['10,00', '20,00'],
+        })
+        
+        result = clean_dataframe(df, StatusClassifier()).set_index('numero_seu')
+        
+        assert pd.isna(result.loc['1', 'nome_pagador'])
+        assert result.loc['2', 'pena_agua'] == '12'
+        assert result.loc['2', 'nome_pagador'] == 'MARIA'
@@ -8,7 +8,12 @@ from datetime import datetime
 from boletos_report.metrics import (
     calculate_open_metrics,
     get_max_min_boleto_open,
-    calculate_temporal_evolution
+    calculate_temporal_evolution,
+    calculate_debt_change_month_over_month,
+    get_most_common_status_by_person,
+    calculate_data_quality,
+    get_df_open,
+    get_top_n_positions
 )
 from boletos_report.status_rules import StatusClassifier
 
@@ -88,3 +93,95 @@ class TestCalculateTemporalEvolution:
         assert temporal.iloc[0]['soma_divida_open'] == 250.0
         assert temporal.iloc[0]['qtd_boletos_open'] == 2
         assert temporal.iloc[0]['qtd_devedores_open_unicos'] == 2
+
+
+class TestCalculateDebtChangeMonthOverMonth:
+    """Testes para calculate_debt_change_month_over_month."""
+    
+    def test_debt_change_meses_consecutivos(self, sample_df):
+        """Testa delta entre meses de uma mesma pessoa."""
+        novo_mes = sample_df[sample_df['person_id'] == '123|JOAO SILVA'].copy()
+        novo_mes['mes_referencia'] = '2025-11'
+        novo_mes['valor_float'] = 150.0
+        df = pd.concat([sample_df, novo_mes], ignore_index=True)
+        
+        changes = calculate_debt_change_month_over_month(df)
+        
+        assert len(changes) == 1
+        row = changes.iloc[0]
+        assert row['person_id'] == '123|JOAO SILVA'
+        assert row['nome'] == 'JOAO SILVA'
+        assert row['mes_anterior'] == '2025-10'
+        assert row['mes_atual'] == '2025-11'
+        assert row['delta'] == 50.0
+        assert row['pct_delta'] == 50.0
+    
+    def test_debt_change_sem_meses_consecutivos(self, sample_df):
+        """Testa que pessoas com um único mês não geram mudanças."""
+        changes = calculate_debt_change_month_over_month(sample_df)
+        assert changes.empty
+
+
+class TestGetMostCommonStatusByPerson:
+    """Testes para get_most_common_status_by_person."""
+    
+    def test_most_common_status(self):
+        """Testa moda por pessoa e desempate pelo menor status."""
+        df_open = pd.DataFrame({
+            'person_id': ['A', 'A', 'A', 'B', 'B'],
+            'status_norm': ['VENCIDO', 'VENCIDO', 'EM ABERTO', 'VENCIDO', 'EM ABERTO'],
+        })
+        
+        moda = get_most_common_status_by_person(df_open)
+        
+        assert moda['A'] == 'VENCIDO'
+        assert moda['B'] == 'EM ABERTO'
+
+
+class TestCalculateDataQuality:
+    """Testes para calculate_data_quality."""
+    
+    def test_duplicidades_numero_nosso(self, sample_df):
+        """Testa contagem de duplicidades ignorando chaves ausentes."""
+        extra = sample_df.iloc[[0, 1, 2]].copy()
+        extra['numero_nosso'] = ['N1', None, None]
+        df = pd.concat([sample_df, extra], ignore_index=True)
+        df.loc[1, 'numero_nosso'] = None
+        
+        quality = calculate_data_quality(df)
+        
+        assert quality['duplicidades_banco_numero_nosso'] == 1
+        assert len(quality['exemplos_dup_nosso']) == 2
+        assert all(ex['numero_nosso'] == 'N1' for ex in quality['exemplos_dup_nosso'])
+
+
+class TestGetTopNPositions:
+    """Testes para get_top_n_positions."""
+    
+    def test_top_n_igual_nlargest(self):
+        """Testa mesma ordem de nlargest/nsmallest, inclusive em empates."""
+        df = pd.DataFrame({'delta': [5.0, -2.0, 5.0, 0.0, -2.0, 7.0, 1.0]})
+        
+        maiores = get_top_n_positions(df['delta'], 3)
+        menores = get_top_n_positions(df['delta'], 3, largest=False)
+        
+        assert list(maiores) == list(df.nlargest(3, 'delta').index)
+        assert list(menores) == list(df.nsmallest(3, 'delta').index)
+    
+    def test_top_n_ignora_ausentes(self):
+        """Testa que valores ausentes não entram no ranking."""
+        valores = pd.Series([1.0, None, 3.0])
+        
+        assert list(get_top_n_positions(valores, 5)) == [2, 0]
+
+
+class TestGetDfOpen:
+    """Testes para get_df_open."""
+    
+    def test_df_open_colunas(self, sample_df):
+        """Testa filtro OPEN mantendo apenas as colunas pedidas."""
+        df_open = get_df_open(sample_df, ['pena_agua', 'valor_float'])
+        
+        assert list(df_open.columns) == ['pena_agua', 'valor_float']
+        assert list(df_open['pena_agua']) == ['123', '789']
+        assert list(get_df_open(sample_df).columns) == list(sample_df.columns)
@@ -7,7 +7,8 @@ import pandas as pd
 from datetime import datetime
 from boletos_report.recurrence import (
     calculate_recurrence,
-    get_top_recurrent_debtors
+    get_top_recurrent_debtors,
+    calculate_recurrence_by_month
 )
 
 
@@ -71,3 +72,17 @@ class TestGetTopRecurrentDebtors:
         assert len(top) == 2
         assert top.iloc[0]['person_id'] == '123|JOAO SILVA'  # Mais reincidente
         assert top.iloc[0]['qtd_boletos_open'] == 3
+
+
+class TestCalculateRecurrenceByMonth:
+    """Testes para calculate_recurrence_by_month."""
+    
+    def test_calculate_recurrence_by_month(self, sample_df_recurrence):
+        """Testa contagem de novos e reincidentes por mês."""
+        por_mes = calculate_recurrence_by_month(sample_df_recurrence)
+        
+        assert por_mes['mes_referencia'].tolist() == ['2025-10', '2025-11', '2025-12']
+        assert por_mes['qtd_devedores_total'].tolist() == [2, 2, 1]
+        assert por_mes['qtd_devedores_novos'].tolist() == [2, 0, 0]
+        assert por_mes['qtd_devedores_reincidentes'].tolist() == [0, 2, 1]
+        assert por_mes['pct_reincidentes'].tolist() == [0.0, 100.0, 100.0]
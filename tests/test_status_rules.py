@@ -3,6 +3,7 @@ Testes para módulo de classificação de status.
 """
 
 import pytest
+import pandas as pd
 from boletos_report.status_rules import StatusClassifier
 
 
@@ -81,3 +82,14 @@ class TestStatusClassifier:
         assert "STATUS1" in unknown
         assert "STATUS2" in unknown
         assert "PAGO NO DIA" not in unknown
+    
+    def test_classify_series(self):
+        """Testa classificação vetorizada de uma coluna de status."""
+        classifier = StatusClassifier()
+        status = pd.Series(["pago no dia", "VENCIDO", None, "STATUS1", "VENCIDO"])
+        
+        status_norm, categoria = classifier.classify_series(status)
+        
+        assert status_norm.tolist() == ["PAGO NO DIA", "VENCIDO", "", "STATUS1", "VENCIDO"]
+        assert categoria.tolist() == ["PAID", "OPEN", "UNKNOWN", "UNKNOWN", "OPEN"]
+        assert classifier.get_unknown_statuses() == {"STATUS1"}